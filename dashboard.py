@@ -12,6 +12,71 @@ import numpy as np
 import re
 from pathlib import Path
 import webbrowser
+import hashlib
+import io
+import csv
+from functools import lru_cache
+from collections import namedtuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Formatos de data testados antes do parsing genérico (Nubank usa ISO)
+DATE_FORMAT_CANDIDATES = [
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%d-%m-%Y',
+    '%Y%m%d'
+]
+
+# Colunas de valores repetidos armazenadas como category
+# (Descrição repete os mesmos estabelecimentos: códigos inteiros no groupby/isin)
+CATEGORICAL_COLUMNS = ['Categoria', 'Tipo', 'Descrição',
+                       'Custo_Tipo', 'Dia_Semana', 'Mes_Nome']
+
+# Colunas auxiliares internas, fora do CSV baixado e das planilhas enviadas
+INTERNAL_COLUMNS = ['Mes_Codigo']
+
+# Opções de ordenação da lista completa de descrições: (coluna, ascendente)
+DESCRIPTION_SORT_OPTIONS = {
+    'Frequência (maior)': ('Frequencia', False),
+    'Frequência (menor)': ('Frequencia', True),
+    'Total gasto (maior)': ('Total_Gasto', False),
+    'Total gasto (menor)': ('Total_Gasto', True)
+}
+
+# Padrões de nome de coluna usados na detecção automática do mapeamento
+COLUMN_MAPPING_PATTERNS = {
+    'Data': re.compile('data|date|dt|timestamp|time'),
+    'Valor': re.compile('valor|value|amount|montante|quantia'),
+    'Descrição': re.compile(
+        'descricao|descrição|description|memo|observacao|observação|historic|title'),
+    'Categoria': re.compile('categoria|category|tipo|class'),
+    'ID': re.compile('id|codigo|código|reference|ref')
+}
+
+# Agregações de despesas compartilhadas entre gráficos e cards
+ExpenseAggregates = namedtuple('ExpenseAggregates', [
+    'despesas_df', 'by_month', 'by_month_cat', 'by_month_custo', 'by_cat_total'])
+
+# Cache em disco dos dados já processados
+PROCESSED_CACHE_DIR = os.path.join("data", "processed")
+# Incrementar quando as colunas geradas por process_financial_data mudarem
+PROCESSED_CACHE_VERSION = 7
+# Incrementar quando a leitura dos CSVs (read_csv_file) mudar
+CSV_CACHE_VERSION = 1
 
 # Importar módulos locais
 try:
@@ -213,14 +278,21 @@ def execute_google_sheets_advanced():
 
     try:
         # Carregar dados primeiro
-        df, loaded_files, is_nubank_data = load_csv_files()
+        cached_df, loaded_files, is_nubank_data = load_processed_cache()
+        if cached_df is not None:
+            df = cached_df
+        else:
+            df, loaded_files, is_nubank_data = load_csv_files_cached(
+                get_csv_fingerprint(loaded_files))
 
-        if df.empty:
-            st.sidebar.error("❌ Nenhum dado encontrado para sincronizar!")
-            return
+            if df.empty:
+                st.sidebar.error("❌ Nenhum dado encontrado para sincronizar!")
+                return
 
-        # Processar dados
-        df = process_financial_data(df, is_nubank_data)
+            # Processar dados
+            df = process_financial_data_cached(
+                df, is_nubank_data, get_csv_fingerprint(loaded_files))
+            save_processed_cache(df)
 
         if df.empty:
             st.sidebar.error("❌ Erro ao processar dados!")
@@ -241,7 +313,8 @@ def execute_google_sheets_advanced():
                         if success:
                             # Upload dados principais
                             sync.upload_dataframe(
-                                df, f"Dados_Completos_{datetime.now().strftime('%Y_%m')}")
+                                df.drop(columns=INTERNAL_COLUMNS, errors='ignore'),
+                                f"Dados_Completos_{datetime.now().strftime('%Y_%m')}")
 
                             # Criar resumos
                             sync.create_summary_sheets(df)
@@ -381,48 +454,19 @@ def detect_column_mappings(df):
             'Valor': 'amount'
         }
 
-    # Detectar coluna de data
-    date_patterns = ['data', 'date', 'dt', 'timestamp', 'time']
-    for col in df.columns:
-        if any(pattern in col.lower() for pattern in date_patterns):
-            column_mapping['Data'] = col
-            break
-
-    # Detectar coluna de valor
-    value_patterns = ['valor', 'value', 'amount', 'montante', 'quantia']
-    for col in df.columns:
-        if any(pattern in col.lower() for pattern in value_patterns):
-            column_mapping['Valor'] = col
-            break
-
-    # Detectar coluna de descrição
-    desc_patterns = ['descricao', 'descrição', 'description',
-                     'memo', 'observacao', 'observação', 'historic', 'title']
-    for col in df.columns:
-        if any(pattern in col.lower() for pattern in desc_patterns):
-            column_mapping['Descrição'] = col
-            break
-
-    # Detectar coluna de categoria
-    cat_patterns = ['categoria', 'category', 'tipo', 'class']
-    for col in df.columns:
-        if any(pattern in col.lower() for pattern in cat_patterns):
-            column_mapping['Categoria'] = col
-            break
-
-    # Detectar coluna de ID
-    id_patterns = ['id', 'codigo', 'código', 'reference', 'ref']
-    for col in df.columns:
-        if any(pattern in col.lower() for pattern in id_patterns):
-            column_mapping['ID'] = col
-            break
+    # Uma única passada de lower() por coluna, testando cada campo com sua regex
+    cols_lower = [col.lower() for col in df.columns]
+    for target, pattern in COLUMN_MAPPING_PATTERNS.items():
+        for col, col_lower in zip(df.columns, cols_lower):
+            if pattern.search(col_lower):
+                column_mapping[target] = col
+                break
 
     return column_mapping
 
 
-@st.cache_data
-def load_csv_files():
-    """Carrega todos os CSVs da pasta especificada, com prioridade para arquivos Nubank"""
+def find_csv_files():
+    """Localiza os CSVs a processar, com prioridade para arquivos Nubank"""
     csv_patterns = [
         "Nubank_*.csv",  # Prioritário: arquivos Nubank
         "*.csv",
@@ -445,48 +489,292 @@ def load_csv_files():
     # Remover duplicatas mantendo ordem
     all_files = list(dict.fromkeys(all_files))
 
-    if not all_files:
+    # Priorizar arquivos Nubank se existirem
+    files_to_process = nubank_files if nubank_files else all_files
+    return files_to_process, len(nubank_files) > 0
+
+
+def detect_csv_format(file, sample_size=4096):
+    """Detecta encoding e separador a partir dos primeiros bytes do arquivo"""
+    with open(file, 'rb') as f:
+        head = f.read(sample_size)
+
+    if head.startswith(b'\xef\xbb\xbf'):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            head.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            # Caractere multibyte cortado no fim da amostra ainda é UTF-8
+            encoding = 'utf-8' if e.start >= len(head) - 3 else 'latin-1'
+
+    try:
+        sample = head.decode(encoding, errors='ignore')
+        sep = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        sep = ','
+
+    return encoding, sep
+
+
+def read_csv_file(file):
+    """Lê um CSV com o engine pyarrow, caindo para o engine C se necessário"""
+    encoding, sep = detect_csv_format(file)
+
+    attempts = [('pyarrow', encoding), ('c', encoding)] if PYARROW_AVAILABLE \
+        else [('c', encoding)]
+    if encoding != 'latin-1':
+        attempts.append(('c', 'latin-1'))
+
+    for engine, attempt_encoding in attempts:
+        try:
+            return pd.read_csv(file, engine=engine, sep=sep, encoding=attempt_encoding)
+        except pd.errors.EmptyDataError:
+            return None
+        except Exception:
+            continue
+    return None
+
+
+def get_csv_cache_path(file):
+    """Caminho do cache parquet de um único CSV (caminho + mtime + tamanho)"""
+    file_stat = os.stat(file)
+    key = hashlib.sha1(
+        f"v{CSV_CACHE_VERSION}|{os.path.abspath(file)}|{file_stat.st_mtime_ns}|{file_stat.st_size}".encode('utf-8'))
+    return os.path.join(PROCESSED_CACHE_DIR, f"csv_{key.hexdigest()}.parquet")
+
+
+def read_csv_file_cached(file):
+    """Lê o CSV do cache parquet quando o arquivo não mudou; senão faz o parsing e grava o cache"""
+    if not PYARROW_AVAILABLE:
+        return read_csv_file(file), None
+
+    cache_path = get_csv_cache_path(file)
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path), cache_path
+        except Exception:
+            pass
+
+    df = read_csv_file(file)
+    if df is not None:
+        try:
+            os.makedirs(PROCESSED_CACHE_DIR, exist_ok=True)
+            df.to_parquet(cache_path, compression='zstd')
+        except Exception:
+            # Colunas com tipos mistos não são serializáveis; segue sem cache
+            pass
+    return df, cache_path
+
+
+def remove_stale_csv_caches(active_paths):
+    """Remove caches parquet de CSVs que mudaram ou deixaram de existir"""
+    for old_cache in glob.glob(os.path.join(PROCESSED_CACHE_DIR, "csv_*.parquet")):
+        if old_cache not in active_paths:
+            try:
+                os.remove(old_cache)
+            except OSError:
+                pass
+
+
+def concat_csv_frames(dfs, origens):
+    """Concatena os CSVs como tabelas Arrow, com arquivo_origem codificado como dicionário"""
+    if PYARROW_AVAILABLE:
+        try:
+            tables = []
+            for df, origem in zip(dfs, origens):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                origem_array = pa.DictionaryArray.from_arrays(
+                    pa.array(np.zeros(len(df), dtype=np.int32)), pa.array([origem]))
+                tables.append(table.append_column('arquivo_origem', origem_array))
+
+            try:
+                combined = pa.concat_tables(
+                    tables, promote_options='permissive')
+            except TypeError:
+                # pyarrow < 14
+                combined = pa.concat_tables(tables, promote=True)
+            return combined.to_pandas()
+        except Exception:
+            pass
+
+    return pd.concat(
+        [df.assign(arquivo_origem=origem) for df, origem in zip(dfs, origens)],
+        ignore_index=True)
+
+
+def load_csv_files():
+    """Carrega todos os CSVs da pasta especificada, com prioridade para arquivos Nubank"""
+    files_to_process, is_nubank_data = find_csv_files()
+
+    if not files_to_process:
         return pd.DataFrame(), [], False
 
     dfs = []
     loaded_files = []
-    is_nubank_data = len(nubank_files) > 0
-
-    # Priorizar arquivos Nubank se existirem
-    files_to_process = nubank_files if nubank_files else all_files
+    active_caches = set()
 
     for file in files_to_process:
         try:
-            # Tentar diferentes encodings
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            separators = [',', ';', '\t']
-            df = None
-
-            for encoding in encodings:
-                for sep in separators:
-                    try:
-                        df = pd.read_csv(file, encoding=encoding, sep=sep)
-                        if len(df.columns) > 1:
-                            break
-                    except (UnicodeDecodeError, pd.errors.EmptyDataError):
-                        continue
-                if df is not None and len(df.columns) > 1:
-                    break
+            df, cache_path = read_csv_file_cached(file)
+            if cache_path:
+                active_caches.add(cache_path)
 
             if df is not None and len(df.columns) > 1:
-                df['arquivo_origem'] = os.path.basename(file)
                 dfs.append(df)
                 loaded_files.append(file)
 
         except Exception as e:
             st.sidebar.error(f"❌ {os.path.basename(file)}: {str(e)}")
 
+    if PYARROW_AVAILABLE:
+        remove_stale_csv_caches(active_caches)
+
     if dfs:
-        combined_df = pd.concat(dfs, ignore_index=True)
+        combined_df = concat_csv_frames(
+            dfs, [os.path.basename(file) for file in loaded_files])
         return combined_df, loaded_files, is_nubank_data
     return pd.DataFrame(), [], False
 
 
+@st.cache_data(show_spinner=False)
+def load_csv_files_cached(fingerprint):
+    """Versão cacheada de load_csv_files, invalidada quando os CSVs mudam"""
+    return load_csv_files()
+
+
+def get_csv_fingerprint(files):
+    """Impressão digital barata dos CSVs: caminho, mtime e tamanho de cada arquivo"""
+    fingerprint = []
+    for file in sorted(files):
+        file_stat = os.stat(file)
+        fingerprint.append((file, file_stat.st_mtime_ns, file_stat.st_size))
+    return tuple(fingerprint)
+
+
+def get_processed_cache_path(files):
+    """Caminho do cache parquet para o conjunto atual de CSVs (nome + mtime + tamanho)"""
+    fingerprint = hashlib.md5(
+        f"v{PROCESSED_CACHE_VERSION};".encode('utf-8'))
+    for file, mtime_ns, size in get_csv_fingerprint(files):
+        fingerprint.update(f"{file}:{mtime_ns}:{size};".encode('utf-8'))
+    return os.path.join(PROCESSED_CACHE_DIR, f"dados_processados_{fingerprint.hexdigest()}.parquet")
+
+
+@st.cache_data(show_spinner=False)
+def read_processed_cache(cache_path):
+    """Lê o parquet processado uma vez por caminho (o nome já embute a impressão digital)"""
+    return pd.read_parquet(cache_path)
+
+
+def load_processed_cache():
+    """Carrega dados já processados do cache parquet, se os CSVs não mudaram"""
+    files, is_nubank_data = find_csv_files()
+    if not PYARROW_AVAILABLE or not files:
+        return None, files, is_nubank_data
+
+    try:
+        cache_path = get_processed_cache_path(files)
+        if os.path.exists(cache_path):
+            return read_processed_cache(cache_path), files, is_nubank_data
+    except Exception:
+        pass
+    return None, files, is_nubank_data
+
+
+def save_processed_cache(df):
+    """Grava o DataFrame processado no cache parquet (zstd)"""
+    if not PYARROW_AVAILABLE or df.empty:
+        return
+
+    files, _ = find_csv_files()
+    if not files:
+        return
+
+    try:
+        os.makedirs(PROCESSED_CACHE_DIR, exist_ok=True)
+        cache_path = get_processed_cache_path(files)
+        # Remover caches de versões anteriores dos CSVs
+        for old_cache in glob.glob(os.path.join(PROCESSED_CACHE_DIR, "dados_processados_*.parquet")):
+            if old_cache != cache_path:
+                os.remove(old_cache)
+        df.to_parquet(cache_path, compression='zstd')
+    except Exception:
+        pass
+
+
+@st.cache_data(show_spinner=False)
+def export_csv_bytes(_df, signature):
+    """Serializa o DataFrame em CSV para download (writer C++ do pyarrow quando disponível)
+
+    O DataFrame não entra no hash (prefixo "_"): o CSV é gerado uma vez por
+    assinatura de filtros, em vez de a cada rerun.
+    """
+    _df = _df.drop(columns=INTERNAL_COLUMNS, errors='ignore')
+    if PYARROW_AVAILABLE:
+        try:
+            table = pa.Table.from_pandas(_df, preserve_index=False)
+            # Mesmo formato do to_csv: datas sem hora e aspas só quando necessário
+            for i, field in enumerate(table.schema):
+                if pa.types.is_boolean(field.type):
+                    raise TypeError("booleanos saem como true/false no pyarrow")
+                if pa.types.is_timestamp(field.type):
+                    column = _df[field.name]
+                    if field.type.tz is not None or not column.dt.normalize().equals(column):
+                        raise TypeError("datas com hora mantêm o formato do pandas")
+                    table = table.set_column(
+                        i, field.name, table.column(i).cast(pa.date32()))
+            buffer = io.BytesIO()
+            pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(
+                quoting_style="needed"))
+            return buffer.getvalue()
+        except Exception:
+            pass
+    return _df.to_csv(index=False).encode('utf-8')
+
+
+def table_column_config(money=(), dates=(), integers=()):
+    """Formatação nativa do st.dataframe (sem Styler): moeda, data e inteiros"""
+    config = {col: st.column_config.NumberColumn(
+        format="R$ %.2f") for col in money}
+    config.update({col: st.column_config.DateColumn(
+        format="DD/MM/YYYY") for col in dates})
+    config.update({col: st.column_config.NumberColumn(
+        format="%d") for col in integers})
+    return config
+
+
+def format_month_codes(codes):
+    """Converte códigos AAAAMM em rótulos 'AAAA-MM', formatando apenas os valores distintos"""
+    labels = {code: f"{code // 100:04d}-{code % 100:02d}"
+              for code in pd.unique(codes)}
+    return codes.map(labels)
+
+
+def infer_date_format(values, sample_size=50):
+    """Infere o formato das datas a partir de uma amostra (evita o parsing elemento a elemento)"""
+    sample = values.dropna().astype(str).str.strip().head(sample_size)
+    if sample.empty:
+        return None
+
+    for date_format in DATE_FORMAT_CANDIDATES:
+        parsed = pd.to_datetime(sample, format=date_format, errors='coerce')
+        if parsed.notna().mean() > 0.9:
+            return date_format
+    return None
+
+
+@st.cache_data(show_spinner=False)
+def process_financial_data_cached(_df, is_nubank_data, fingerprint):
+    """Versão cacheada de process_financial_data, invalidada quando os CSVs mudam
+
+    O DataFrame não entra no hash (prefixo "_"); a chave é a impressão digital
+    dos arquivos de origem retornada por get_csv_fingerprint.
+    """
+    return process_financial_data(_df, is_nubank_data)
+
+
 def process_financial_data(df, is_nubank_data=False):
     """Processa e limpa os dados financeiros"""
     if df.empty:
@@ -519,16 +807,26 @@ def process_financial_data(df, is_nubank_data=False):
 
     # Processar coluna de data
     try:
-        df_processed['Data'] = pd.to_datetime(
-            df_processed['Data'], errors='coerce', dayfirst=True)
+        date_format = infer_date_format(df_processed['Data'])
+        if date_format:
+            df_processed['Data'] = pd.to_datetime(
+                df_processed['Data'], format=date_format, errors='coerce', cache=True)
+        else:
+            df_processed['Data'] = pd.to_datetime(
+                df_processed['Data'], errors='coerce', dayfirst=True, cache=True)
         df_processed = df_processed.dropna(subset=['Data'])
 
-        # Criar colunas de tempo
-        df_processed['Mes'] = df_processed['Data'].dt.to_period('M')
-        df_processed['Mes_Str'] = df_processed['Data'].dt.strftime('%Y-%m')
-        df_processed['Ano'] = df_processed['Data'].dt.year
-        df_processed['Mes_Nome'] = df_processed['Data'].dt.strftime('%B')
-        df_processed['Dia_Semana'] = df_processed['Data'].dt.strftime('%A')
+        # Criar colunas de tempo (chave inteira AAAAMM; texto só para meses distintos)
+        datas = df_processed['Data'].dt
+        anos = datas.year.to_numpy(dtype=np.int32)
+        mes_codigo = pd.Series(anos * 100 + datas.month.to_numpy(dtype=np.int32),
+                               index=df_processed.index)
+        df_processed['Mes'] = format_month_codes(mes_codigo)
+        df_processed['Mes_Str'] = df_processed['Mes']
+        df_processed['Ano'] = anos.astype(np.int16)
+        df_processed['Mes_Nome'] = datas.month_name()
+        df_processed['Dia_Semana'] = datas.day_name()
+        df_processed['Mes_Codigo'] = mes_codigo
 
     except Exception as e:
         st.error(f"❌ Erro ao processar datas: {e}")
@@ -537,27 +835,28 @@ def process_financial_data(df, is_nubank_data=False):
     # Processar valores
     try:
         if df_processed['Valor'].dtype == 'object':
-            df_processed['Valor'] = df_processed['Valor'].astype(str)
-            df_processed['Valor'] = df_processed['Valor'].str.replace(
-                r'[R$\s]', '', regex=True)
-            df_processed['Valor'] = df_processed['Valor'].str.replace(
-                ',', '.', regex=False)
+            # .str opera direto sobre object; valores já numéricos viram NaN
+            # na limpeza e são restaurados pelo fillna
+            valores_brutos = df_processed['Valor']
+            df_processed['Valor'] = valores_brutos.str.replace(
+                r'[R$\s]', '', regex=True).str.replace(
+                ',', '.', regex=False).fillna(valores_brutos)
 
         df_processed['Valor'] = pd.to_numeric(
             df_processed['Valor'], errors='coerce')
         df_processed = df_processed.dropna(subset=['Valor'])
 
+        valores = df_processed['Valor'].to_numpy()
+
         # Para dados Nubank, tratar diferentemente
         if is_nubank_data:
             # No Nubank, valores negativos são despesas, positivos são receitas/estornos
-            df_processed['Tipo'] = df_processed['Valor'].apply(
-                lambda x: 'Receita' if x > 0 else 'Despesa')
-            df_processed['Valor_Absoluto'] = df_processed['Valor'].abs()
+            df_processed['Tipo'] = np.where(valores > 0, 'Receita', 'Despesa')
+            df_processed['Valor_Absoluto'] = np.abs(valores)
         else:
             # Dados bancários tradicionais
-            df_processed['Tipo'] = df_processed['Valor'].apply(
-                lambda x: 'Receita' if x > 0 else 'Despesa')
-            df_processed['Valor_Absoluto'] = df_processed['Valor'].abs()
+            df_processed['Tipo'] = np.where(valores > 0, 'Receita', 'Despesa')
+            df_processed['Valor_Absoluto'] = np.abs(valores)
 
     except Exception as e:
         st.error(f"❌ Erro ao processar valores: {e}")
@@ -576,6 +875,10 @@ def process_financial_data(df, is_nubank_data=False):
         'Sem descrição')
     df_processed['Descrição'] = df_processed['Descrição'].astype(
         str).str.strip()
+    if PYARROW_AVAILABLE:
+        # Strings contíguas em buffers Arrow (depois viram o dicionário da coluna category)
+        df_processed['Descrição'] = df_processed['Descrição'].astype(
+            'string[pyarrow]')
 
     # Preencher categorias faltantes
     if 'Categoria' not in df_processed.columns:
@@ -595,9 +898,58 @@ def process_financial_data(df, is_nubank_data=False):
         df_processed = df_processed.drop_duplicates(
             subset=['ID'], keep='first')
 
+    # Colunas com valores repetidos como category (códigos inteiros + dicionário)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df_processed.columns:
+            df_processed[col] = df_processed[col].astype('category')
+
     return df_processed
 
 
+def build_pattern_regex(patterns):
+    """Combina padrões literais em uma única alternação regex"""
+    return '|'.join(re.escape(pattern) for pattern in patterns)
+
+
+@lru_cache(maxsize=None)
+def build_pattern_automaton(patterns_key):
+    """Monta (uma vez) o autômato Aho-Corasick com todas as palavras-chave das categorias"""
+    automaton = ahocorasick.Automaton()
+    for category_index, (_, patterns) in enumerate(patterns_key):
+        for pattern in patterns:
+            word = pattern.upper()
+            automaton.add_word(
+                word, automaton.get(word, ()) + (category_index,))
+    automaton.make_automaton()
+    return automaton
+
+
+def match_category_patterns(descricoes, patterns_by_category):
+    """Retorna matriz booleana (linhas x categorias) com as categorias que casam em cada descrição"""
+    # Classifica cada descrição distinta uma única vez; as linhas herdam pelo código
+    codes, uniques = pd.factorize(descricoes)
+    uniques = pd.Series(uniques)
+
+    # Linha extra toda False no fim: códigos -1 (descrição ausente) apontam para ela
+    unique_matches = np.zeros(
+        (len(uniques) + 1, len(patterns_by_category)), dtype=bool)
+
+    if AHOCORASICK_AVAILABLE:
+        # Uma única varredura por descrição para todas as palavras-chave
+        automaton = build_pattern_automaton(tuple(
+            (category, tuple(patterns)) for category, patterns in patterns_by_category.items()))
+        textos = uniques.astype(str).str.upper()
+        for row, texto in enumerate(textos):
+            for _, category_indices in automaton.iter(texto):
+                unique_matches[row, list(category_indices)] = True
+    else:
+        for col, patterns in enumerate(patterns_by_category.values()):
+            unique_matches[:-1, col] = uniques.str.contains(
+                build_pattern_regex(patterns), case=False, na=False).to_numpy()
+
+    return unique_matches[codes]
+
+
 def improve_nubank_categorization(df):
     """Melhora a categorização específica para dados do Nubank"""
 
@@ -655,11 +1007,15 @@ def improve_nubank_categorization(df):
         ]
     }
 
-    # Aplicar padrões específicos do Nubank
-    for category, patterns in nubank_patterns.items():
-        for pattern in patterns:
-            mask = df['Descrição'].str.contains(pattern, case=False, na=False)
-            df.loc[mask, 'Categoria'] = category
+    # Aplicar padrões específicos do Nubank (última categoria que casar prevalece)
+    matches = match_category_patterns(df['Descrição'], nubank_patterns)
+    categories = list(nubank_patterns)
+    # np.select escolhe a primeira condição verdadeira: ordem invertida preserva a precedência
+    df['Categoria'] = np.select(
+        [matches[:, col] for col in reversed(range(len(categories)))],
+        categories[::-1],
+        default=df['Categoria'].to_numpy(dtype=object)
+    )
 
     return df
 
@@ -679,24 +1035,37 @@ def identify_fixed_costs(df):
         'Entretenimento': ['NETFLIX', 'SPOTIFY', 'AMAZON PRIME', 'DISNEY', 'GLOBOPLAY', 'Google']
     }
 
-    for categoria, patterns in fixed_patterns.items():
-        for pattern in patterns:
-            if 'Descrição' in df.columns:
-                mask = df['Descrição'].str.contains(
-                    pattern, case=False, na=False)
-                df.loc[mask, 'Custo_Tipo'] = 'Fixo'
-                df.loc[mask & (df['Categoria'] == 'Outros'),
-                       'Categoria'] = categoria
+    if 'Descrição' in df.columns:
+        matches = match_category_patterns(df['Descrição'], fixed_patterns)
+        df['Custo_Tipo'] = np.where(
+            matches.any(axis=1), 'Fixo', 'Variável').astype(object)
+
+        # Só recategoriza o que ainda está em 'Outros'; o primeiro padrão que casar prevalece
+        is_outros = (df['Categoria'] == 'Outros').to_numpy()
+        df['Categoria'] = np.select(
+            [is_outros & matches[:, col]
+                for col in range(len(fixed_patterns))],
+            list(fixed_patterns),
+            default=df['Categoria'].to_numpy(dtype=object)
+        )
 
     # Identificar gastos recorrentes (aparecem em pelo menos 3 períodos)
-    if len(df) > 0 and 'Mes' in df.columns:
-        despesas = df[df['Tipo'] == 'Despesa'].copy()
-        if not despesas.empty and 'Descrição' in despesas.columns:
-            freq_descriptions = despesas.groupby('Descrição')['Mes'].nunique()
-            recurring_descriptions = freq_descriptions[freq_descriptions >= 2].index
-
-            mask = df['Descrição'].isin(
-                recurring_descriptions) & (df['Tipo'] == 'Despesa')
+    if len(df) > 0 and 'Mes_Codigo' in df.columns and 'Descrição' in df.columns:
+        is_despesa = (df['Tipo'] == 'Despesa').to_numpy()
+        desc_codes, desc_uniques = pd.factorize(df['Descrição'])
+        mes_codes, mes_uniques = pd.factorize(df['Mes_Codigo'])
+
+        if is_despesa.any() and len(desc_uniques) > 0:
+            # Pares (descrição, mês) únicos viram inteiros; bincount conta meses por descrição
+            valid = is_despesa & (desc_codes >= 0) & (mes_codes >= 0)
+            n_meses = len(mes_uniques)
+            pairs = np.unique(
+                desc_codes[valid].astype(np.int64) * n_meses + mes_codes[valid])
+            meses_por_desc = np.bincount(
+                pairs // n_meses, minlength=len(desc_uniques))
+
+            mask = is_despesa & (desc_codes >= 0) & (
+                meses_por_desc[desc_codes] >= 2)
             df.loc[mask, 'Custo_Tipo'] = 'Fixo'
 
     return df
@@ -707,7 +1076,7 @@ def create_monthly_analysis(df):
     if df.empty:
         return pd.DataFrame()
 
-    monthly_data = df.groupby(['Mes_Str', 'Tipo']).agg({
+    monthly_data = df.groupby(['Mes_Codigo', 'Tipo'], observed=True, sort=False).agg({
         'Valor_Absoluto': 'sum',
         'Data': 'count'
     }).reset_index()
@@ -715,10 +1084,12 @@ def create_monthly_analysis(df):
     monthly_data.rename(columns={'Data': 'Quantidade'}, inplace=True)
 
     monthly_pivot = monthly_data.pivot(
-        index='Mes_Str',
+        index='Mes_Codigo',
         columns='Tipo',
         values='Valor_Absoluto'
     ).fillna(0)
+    # 'Tipo' é categórico: colunas comuns permitem acrescentar Saldo/Taxa
+    monthly_pivot.columns = monthly_pivot.columns.astype(str)
 
     monthly_pivot['Saldo'] = monthly_pivot.get(
         'Receita', 0) - monthly_pivot.get('Despesa', 0)
@@ -726,15 +1097,45 @@ def create_monthly_analysis(df):
         monthly_pivot['Saldo'] / monthly_pivot.get('Receita', 1) * 100
     ).replace([np.inf, -np.inf], 0)
 
-    return monthly_pivot.reset_index()
+    monthly_pivot = monthly_pivot.reset_index()
+    monthly_pivot.insert(0, 'Mes_Str', format_month_codes(
+        monthly_pivot['Mes_Codigo']))
+    return monthly_pivot
+
+
+def precompute_aggregates(df):
+    """Agrega as despesas uma única vez por mês/categoria/tipo de custo para gráficos e cards"""
+    despesas_df = df[df['Tipo'] == 'Despesa']
+
+    keys = ['Mes_Str', 'Categoria']
+    if 'Custo_Tipo' in df.columns:
+        keys.append('Custo_Tipo')
+    base = despesas_df.groupby(keys, observed=True)['Valor_Absoluto'].sum()
+
+    by_month_cat = base.groupby(
+        level=['Mes_Str', 'Categoria'], observed=True).sum()
+    by_month_custo = base.groupby(
+        level=['Mes_Str', 'Custo_Tipo'], observed=True).sum() if 'Custo_Tipo' in keys else None
+
+    return ExpenseAggregates(
+        despesas_df=despesas_df,
+        by_month=by_month_cat.groupby(level='Mes_Str').sum(),
+        by_month_cat=by_month_cat,
+        by_month_custo=by_month_custo,
+        by_cat_total=by_month_cat.groupby(
+            level='Categoria', observed=True).sum()
+    )
 
 
-def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
+def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False, aggregates=None):
     """Cria visualizações específicas para dados do Nubank ou bancários tradicionais"""
 
     if monthly_analysis.empty or df.empty:
         return None, None, None, None, None
 
+    if aggregates is None:
+        aggregates = precompute_aggregates(df)
+
     # 1. Gráfico de evolução mensal
     fig_monthly = go.Figure()
 
@@ -783,7 +1184,7 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
 
     # Adicionar linha de tendência
     if len(monthly_analysis) > 1 and 'Despesa' in monthly_analysis.columns:
-        fig_monthly.add_trace(go.Scatter(
+        fig_monthly.add_trace(go.Scattergl(
             name='Tendência',
             x=monthly_analysis['Mes_Str'],
             y=monthly_analysis['Despesa'].rolling(window=2).mean(),
@@ -804,12 +1205,11 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
     )
 
     # 2. Gráfico de pizza por categoria
-    despesas_df = df[df['Tipo'] == 'Despesa']
+    despesas_df = aggregates.despesas_df
     fig_category = None
 
     if not despesas_df.empty:
-        category_data = despesas_df.groupby(
-            'Categoria')['Valor_Absoluto'].sum().reset_index()
+        category_data = aggregates.by_cat_total.reset_index()
         category_data = category_data.sort_values(
             'Valor_Absoluto', ascending=False)
 
@@ -837,9 +1237,8 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
 
     # 3. Custos fixos vs variáveis
     fig_fixed_var = None
-    if 'Custo_Tipo' in df.columns:
-        fixed_var_data = df[df['Tipo'] == 'Despesa'].groupby(['Mes_Str', 'Custo_Tipo'])[
-            'Valor_Absoluto'].sum().reset_index()
+    if aggregates.by_month_custo is not None:
+        fixed_var_data = aggregates.by_month_custo.reset_index()
 
         if not fixed_var_data.empty and len(fixed_var_data) > 0:
             title_fixed = '💡 Custos Fixos vs Variáveis - Nubank' if is_nubank_data else '💡 Custos Fixos vs Variáveis'
@@ -864,13 +1263,12 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
     # 4. Tendências por categoria (top 6)
     fig_trends = None
     if not despesas_df.empty:
-        category_totals = despesas_df.groupby(
-            'Categoria')['Valor_Absoluto'].sum()
-        top_categories = category_totals.nlargest(6).index
+        top_categories = aggregates.by_cat_total.nlargest(6).index
 
-        trend_data = despesas_df[
-            despesas_df['Categoria'].isin(top_categories)
-        ].groupby(['Mes_Str', 'Categoria'])['Valor_Absoluto'].sum().reset_index()
+        by_month_cat = aggregates.by_month_cat
+        trend_data = by_month_cat[
+            by_month_cat.index.get_level_values('Categoria').isin(top_categories)
+        ].reset_index()
 
         if not trend_data.empty and len(trend_data) > 0:
             title_trends = '📈 Tendência dos Gastos por Categoria (Top 6) - Nubank' if is_nubank_data else '📈 Tendência das Despesas por Categoria (Top 6)'
@@ -883,7 +1281,8 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
                 title=title_trends,
                 markers=True,
                 labels={'Mes_Str': 'Mês', 'Valor_Absoluto': 'Valor (R$)'},
-                color_discrete_sequence=px.colors.qualitative.Set2
+                color_discrete_sequence=px.colors.qualitative.Set2,
+                render_mode='webgl'
             )
             fig_trends.update_layout(
                 height=400,
@@ -942,56 +1341,78 @@ def create_visualizations_nubank(df, monthly_analysis, is_nubank_data=False):
     return fig_monthly, fig_category, fig_fixed_var, fig_trends, fig_gauge
 
 
-def create_financial_summary_cards(df, monthly_analysis, is_nubank_data=False):
+@st.cache_data(show_spinner=False)
+def create_monthly_analysis_cached(_df, signature):
+    """Versão cacheada de create_monthly_analysis, chaveada pela assinatura dos filtros"""
+    return create_monthly_analysis(_df)
+
+
+@st.cache_data(show_spinner=False)
+def precompute_aggregates_cached(_df, signature):
+    """Versão cacheada de precompute_aggregates, chaveada pela assinatura dos filtros"""
+    return precompute_aggregates(_df)
+
+
+@st.cache_data(show_spinner=False)
+def create_visualizations_cached(_df, _monthly_analysis, is_nubank_data, _aggregates, signature):
+    """Versão cacheada de create_visualizations_nubank
+
+    Os DataFrames não entram no hash (prefixo "_"); a chave é a assinatura
+    formada pela impressão digital dos CSVs e pelos valores dos filtros.
+    """
+    return create_visualizations_nubank(_df, _monthly_analysis, is_nubank_data, _aggregates)
+
+
+def create_financial_summary_cards(df, monthly_analysis, is_nubank_data=False, aggregates=None):
     """Cria cards de resumo financeiro"""
     if df.empty or monthly_analysis.empty:
         return
 
-    # Calcular métricas do último mês
-    latest_month = df['Mes_Str'].max()
-    current_month_data = df[df['Mes_Str'] == latest_month]
+    if aggregates is None:
+        aggregates = precompute_aggregates(df)
+
+    # Meses já vêm ordenados na análise mensal (índice Mes_Codigo do pivot)
+    latest_month = monthly_analysis['Mes_Str'].iloc[-1]
+    previous_month = monthly_analysis['Mes_Str'].iloc[-2] if len(
+        monthly_analysis) >= 2 else None
+
+    # Calcular métricas do último mês (comparação inteira em Mes_Codigo)
+    is_latest = df['Mes_Codigo'].to_numpy(
+    ) == monthly_analysis['Mes_Codigo'].iloc[-1]
+    tipos_mes = df['Tipo'].to_numpy()[is_latest]
+    valores_mes = df['Valor_Absoluto'].to_numpy()[is_latest]
+    num_despesas_mes = int((tipos_mes == 'Despesa').sum())
 
-    total_despesas = current_month_data[current_month_data['Tipo']
-                                        == 'Despesa']['Valor_Absoluto'].sum()
-    total_receitas = current_month_data[current_month_data['Tipo']
-                                        == 'Receita']['Valor_Absoluto'].sum()
-    num_transacoes = len(current_month_data)
-    gasto_medio_transacao = total_despesas / len(current_month_data[current_month_data['Tipo'] == 'Despesa']) if len(
-        current_month_data[current_month_data['Tipo'] == 'Despesa']) > 0 else 0
+    total_despesas = aggregates.by_month.get(latest_month, 0)
+    total_receitas = valores_mes[tipos_mes == 'Receita'].sum()
+    num_transacoes = int(is_latest.sum())
+    gasto_medio_transacao = total_despesas / \
+        num_despesas_mes if num_despesas_mes > 0 else 0
 
     # Custos fixos do mês
-    if 'Custo_Tipo' in current_month_data.columns:
-        custos_fixos = current_month_data[
-            (current_month_data['Custo_Tipo'] == 'Fixo') &
-            (current_month_data['Tipo'] == 'Despesa')
-        ]['Valor_Absoluto'].sum()
-        custos_variaveis = current_month_data[
-            (current_month_data['Custo_Tipo'] == 'Variável') &
-            (current_month_data['Tipo'] == 'Despesa')
-        ]['Valor_Absoluto'].sum()
+    if aggregates.by_month_custo is not None:
+        custos_fixos = aggregates.by_month_custo.get(
+            (latest_month, 'Fixo'), 0)
+        custos_variaveis = aggregates.by_month_custo.get(
+            (latest_month, 'Variável'), 0)
     else:
         custos_fixos = 0
         custos_variaveis = total_despesas
 
     # Categoria que mais gastou
-    despesas_mes = current_month_data[current_month_data['Tipo'] == 'Despesa']
-    if not despesas_mes.empty:
-        categoria_top = despesas_mes.groupby(
-            'Categoria')['Valor_Absoluto'].sum().idxmax()
-        valor_categoria_top = despesas_mes.groupby(
-            'Categoria')['Valor_Absoluto'].sum().max()
+    if num_despesas_mes > 0:
+        category_sums = aggregates.by_month_cat.loc[latest_month]
+        top_position = category_sums.to_numpy().argmax()
+        categoria_top = category_sums.index[top_position]
+        valor_categoria_top = category_sums.iloc[top_position]
     else:
         categoria_top = "N/A"
         valor_categoria_top = 0
 
     # Comparação com mês anterior
-    months = sorted(df['Mes_Str'].unique())
     delta_despesas_pct = 0
-    if len(months) >= 2:
-        previous_month = months[-2]
-        prev_month_data = df[df['Mes_Str'] == previous_month]
-        prev_despesas = prev_month_data[prev_month_data['Tipo']
-                                        == 'Despesa']['Valor_Absoluto'].sum()
+    if previous_month is not None:
+        prev_despesas = aggregates.by_month.get(previous_month, 0)
         if prev_despesas > 0:
             delta_despesas = total_despesas - prev_despesas
             delta_despesas_pct = (delta_despesas / prev_despesas * 100)
@@ -1091,7 +1512,62 @@ def create_financial_summary_cards(df, monthly_analysis, is_nubank_data=False):
             )
 
 
-def show_expense_titles_analysis(df, is_nubank_data=False):
+def render_report_blocks(blocks):
+    """Junta os blocos de um relatório em um único markdown, separados por linha horizontal"""
+    return "".join(f"{block}\n\n---\n\n" for block in blocks)
+
+
+def top_n_rows(df, column, n):
+    """Maiores n linhas por coluna via argpartition (O(N)), ordenando só os n escolhidos"""
+    values = df[column].to_numpy()
+    if len(values) <= n:
+        return df.iloc[np.argsort(-values, kind='stable')]
+
+    top_idx = np.argpartition(values, -n)[-n:]
+    top_idx = top_idx[np.argsort(-values[top_idx], kind='stable')]
+    return df.iloc[top_idx]
+
+
+def summarize_descriptions(df):
+    """Totais, média, frequência e primeira/última data por descrição"""
+    return df.groupby('Descrição', observed=True, sort=False).agg(
+        Total_Gasto=('Valor_Absoluto', 'sum'),
+        Gasto_Medio=('Valor_Absoluto', 'mean'),
+        Frequencia=('Valor_Absoluto', 'count'),
+        Primeira_Transacao=('Data', 'min'),
+        Ultima_Transacao=('Data', 'max')
+    ).round(2).astype({'Frequencia': np.uint32})
+
+
+def get_tab_aggregates(filtered_df, filter_signature):
+    """Agregações das abas guardadas no session_state, recalculadas só quando os filtros mudam"""
+    if st.session_state.get('_tab_aggregates_key') != filter_signature:
+        despesas = filtered_df[filtered_df['Tipo'] == 'Despesa']
+        aggregates = {
+            'descricoes': summarize_descriptions(filtered_df),
+            'top_expenses': top_n_rows(despesas, 'Valor_Absoluto', 15),
+            'counts_per_month': filtered_df.groupby(
+                'Mes_Str', observed=True, sort=False).size(),
+            'category_report': despesas.groupby(
+                'Categoria', observed=True)['Valor_Absoluto'].agg(['sum', 'mean', 'count']).round(2).reset_index()
+        }
+
+        if 'Custo_Tipo' in filtered_df.columns:
+            aggregates['fixed_expenses'] = filtered_df[
+                filtered_df['Custo_Tipo'] == 'Fixo'
+            ].groupby('Descrição', observed=True, sort=False)['Valor_Absoluto'].mean().nlargest(10)
+            custo_summary = despesas.groupby(
+                'Custo_Tipo', observed=True)['Valor_Absoluto'].agg(['sum', 'mean', 'count'])
+            custo_summary.columns = ['Total', 'Média', 'Quantidade']
+            aggregates['custo_summary'] = custo_summary
+
+        st.session_state['_tab_aggregates'] = aggregates
+        st.session_state['_tab_aggregates_key'] = filter_signature
+
+    return st.session_state['_tab_aggregates']
+
+
+def show_expense_titles_analysis(df, is_nubank_data=False, frequency_analysis=None):
     """Mostra análise detalhada dos títulos/descrições das transações"""
     title = "🏪 Análise Detalhada dos Estabelecimentos - Nubank" if is_nubank_data else "🏪 Análise Detalhada das Transações"
     st.subheader(title)
@@ -1100,25 +1576,29 @@ def show_expense_titles_analysis(df, is_nubank_data=False):
         st.info("Nenhum dado disponível para análise.")
         return
 
-    # Estatísticas gerais
+    # Estatísticas gerais (uma única contagem por descrição)
+    description_counts = df['Descrição'].value_counts()
+    # Categórica: descrições fora do filtro aparecem com contagem zero
+    description_counts = description_counts[description_counts > 0]
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        unique_descriptions = df['Descrição'].nunique()
+        unique_descriptions = len(description_counts)
         label = "🏪 Estabelecimentos Únicos" if is_nubank_data else "📝 Descrições Únicas"
         st.metric(label, unique_descriptions)
 
     with col2:
-        most_frequent = df['Descrição'].mode(
-        ).iloc[0] if not df['Descrição'].mode().empty else "N/A"
-        frequency = df['Descrição'].value_counts(
-        ).iloc[0] if len(df) > 0 else 0
+        if not description_counts.empty:
+            most_frequent = str(description_counts.index[0])
+            frequency = description_counts.iloc[0]
+        else:
+            most_frequent, frequency = "N/A", 0
         st.metric("🔄 Mais Frequente", f"{frequency}x", delta=most_frequent[:20] + "..." if len(
             most_frequent) > 20 else most_frequent)
 
     with col3:
         avg_per_establishment = df.groupby(
-            'Descrição')['Valor_Absoluto'].mean().mean()
+            'Descrição', observed=True, sort=False)['Valor_Absoluto'].mean().mean()
         label = "💰 Gasto Médio por Local" if is_nubank_data else "💰 Valor Médio por Descrição"
         st.metric(label, f"R$ {avg_per_establishment:.2f}")
 
@@ -1126,15 +1606,9 @@ def show_expense_titles_analysis(df, is_nubank_data=False):
     freq_title = "🔄 Estabelecimentos por Frequência" if is_nubank_data else "🔄 Transações por Frequência"
     st.markdown(f"#### {freq_title}")
 
-    frequency_analysis = df.groupby('Descrição').agg({
-        'Valor_Absoluto': ['sum', 'mean', 'count'],
-        'Data': ['min', 'max']
-    }).round(2)
-
-    frequency_analysis.columns = ['Total_Gasto', 'Gasto_Medio',
-                                  'Frequencia', 'Primeira_Transacao', 'Ultima_Transacao']
-    frequency_analysis = frequency_analysis.sort_values(
-        'Frequencia', ascending=False)
+    # Um único groupby por descrição, reaproveitado nos rankings e na busca
+    if frequency_analysis is None:
+        frequency_analysis = summarize_descriptions(df)
 
     # Top 20 mais frequentes
     col1, col2 = st.columns(2)
@@ -1142,43 +1616,43 @@ def show_expense_titles_analysis(df, is_nubank_data=False):
     with col1:
         freq_label = "🏆 Top 10 - Mais Frequentes" if is_nubank_data else "🏆 Top 10 - Mais Usados"
         st.markdown(f"##### {freq_label}")
-        top_frequent = frequency_analysis.head(10)
+        top_frequent = frequency_analysis.nlargest(10, 'Frequencia')
 
-        for idx, (desc, row) in enumerate(top_frequent.iterrows(), 1):
-            with st.expander(f"{idx}. {desc} ({int(row['Frequencia'])}x)"):
-                st.write(f"💳 **Total:** R$ {row['Total_Gasto']:,.2f}")
-                st.write(f"📊 **Gasto médio:** R$ {row['Gasto_Medio']:,.2f}")
+        for idx, (desc, total, media, frequencia, primeira, ultima) in enumerate(
+                top_frequent.itertuples(name=None), 1):
+            with st.expander(f"{idx}. {desc} ({int(frequencia)}x)"):
+                st.write(f"💳 **Total:** R$ {total:,.2f}")
+                st.write(f"📊 **Gasto médio:** R$ {media:,.2f}")
                 st.write(
-                    f"📅 **Primeira:** {row['Primeira_Transacao'].strftime('%d/%m/%Y')}")
+                    f"📅 **Primeira:** {primeira.strftime('%d/%m/%Y')}")
                 st.write(
-                    f"📅 **Última:** {row['Ultima_Transacao'].strftime('%d/%m/%Y')}")
+                    f"📅 **Última:** {ultima.strftime('%d/%m/%Y')}")
 
                 # Calcular frequência mensal
-                dias_periodo = (row['Ultima_Transacao'] -
-                                row['Primeira_Transacao']).days
+                dias_periodo = (ultima - primeira).days
                 if dias_periodo > 0:
-                    freq_mensal = (row['Frequencia'] / dias_periodo) * 30
+                    freq_mensal = (frequencia / dias_periodo) * 30
                     st.write(
                         f"📈 **Frequência estimada:** {freq_mensal:.1f}x por mês")
 
     with col2:
         expense_label = "💸 Top 10 - Maiores Gastos" if is_nubank_data else "💸 Top 10 - Maiores Valores"
         st.markdown(f"##### {expense_label}")
-        top_expensive = frequency_analysis.sort_values(
-            'Total_Gasto', ascending=False).head(10)
-
-        for idx, (desc, row) in enumerate(top_expensive.iterrows(), 1):
-            with st.expander(f"{idx}. {desc} (R$ {row['Total_Gasto']:,.2f})"):
-                st.write(f"🔄 **Frequência:** {int(row['Frequencia'])}x")
-                st.write(f"📊 **Gasto médio:** R$ {row['Gasto_Medio']:,.2f}")
+        top_expensive = frequency_analysis.nlargest(10, 'Total_Gasto')
+        total_geral = df['Valor_Absoluto'].sum()
+
+        for idx, (desc, total, media, frequencia, primeira, ultima) in enumerate(
+                top_expensive.itertuples(name=None), 1):
+            with st.expander(f"{idx}. {desc} (R$ {total:,.2f})"):
+                st.write(f"🔄 **Frequência:** {int(frequencia)}x")
+                st.write(f"📊 **Gasto médio:** R$ {media:,.2f}")
                 st.write(
-                    f"📅 **Primeira:** {row['Primeira_Transacao'].strftime('%d/%m/%Y')}")
+                    f"📅 **Primeira:** {primeira.strftime('%d/%m/%Y')}")
                 st.write(
-                    f"📅 **Última:** {row['Ultima_Transacao'].strftime('%d/%m/%Y')}")
+                    f"📅 **Última:** {ultima.strftime('%d/%m/%Y')}")
 
                 # Percentual do total
-                total_geral = df['Valor_Absoluto'].sum()
-                percentual = (row['Total_Gasto'] / total_geral) * 100
+                percentual = (total / total_geral) * 100
                 st.write(f"📊 **Representa:** {percentual:.1f}% do total")
 
     # Busca por estabelecimento
@@ -1189,35 +1663,29 @@ def show_expense_titles_analysis(df, is_nubank_data=False):
         "Digite o termo para buscar:", placeholder=search_placeholder)
 
     if search_term:
-        filtered_descriptions = df[df['Descrição'].str.contains(
+        # Busca direto no índice já agregado, sem reagrupar as transações
+        search_results = frequency_analysis[frequency_analysis.index.str.contains(
             search_term, case=False, na=False)]
 
-        if not filtered_descriptions.empty:
-            search_results = filtered_descriptions.groupby('Descrição').agg({
-                'Valor_Absoluto': ['sum', 'mean', 'count'],
-                'Data': ['min', 'max']
-            }).round(2)
-
-            search_results.columns = ['Total_Gasto', 'Gasto_Medio',
-                                      'Frequencia', 'Primeira_Transacao', 'Ultima_Transacao']
+        if not search_results.empty:
             search_results = search_results.sort_values(
                 'Total_Gasto', ascending=False)
 
             st.write(
                 f"🎯 **Encontrados {len(search_results)} resultados com '{search_term}'**")
 
-            for desc, row in search_results.iterrows():
+            for desc, total, media, frequencia, primeira, ultima in search_results.itertuples(name=None):
                 st.write(f"**{desc}**")
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("💳 Total", f"R$ {row['Total_Gasto']:,.2f}")
+                    st.metric("💳 Total", f"R$ {total:,.2f}")
                 with col2:
-                    st.metric("📊 Média", f"R$ {row['Gasto_Medio']:,.2f}")
+                    st.metric("📊 Média", f"R$ {media:,.2f}")
                 with col3:
-                    st.metric("🔄 Vezes", f"{int(row['Frequencia'])}")
+                    st.metric("🔄 Vezes", f"{int(frequencia)}")
                 with col4:
                     st.metric(
-                        "📅 Período", f"{row['Primeira_Transacao'].strftime('%m/%Y')} - {row['Ultima_Transacao'].strftime('%m/%Y')}")
+                        "📅 Período", f"{primeira.strftime('%m/%Y')} - {ultima.strftime('%m/%Y')}")
                 st.markdown("---")
         else:
             st.info(f"Nenhum resultado encontrado com '{search_term}'")
@@ -1235,36 +1703,41 @@ def show_expense_titles_analysis(df, is_nubank_data=False):
     with col3:
         show_count = st.selectbox("Mostrar:", [20, 50, 100, "Todos"])
 
-    # Aplicar filtros e ordenação
-    filtered_data = frequency_analysis[frequency_analysis['Frequencia']
-                                       >= min_frequency]
-
-    if sort_option == 'Frequência (maior)':
-        filtered_data = filtered_data.sort_values(
-            'Frequencia', ascending=False)
-    elif sort_option == 'Frequência (menor)':
-        filtered_data = filtered_data.sort_values('Frequencia', ascending=True)
-    elif sort_option == 'Total gasto (maior)':
-        filtered_data = filtered_data.sort_values(
-            'Total_Gasto', ascending=False)
-    elif sort_option == 'Total gasto (menor)':
-        filtered_data = filtered_data.sort_values(
-            'Total_Gasto', ascending=True)
-    elif sort_option == 'Alfabética':
-        filtered_data = filtered_data.sort_index()
-
-    if show_count != "Todos":
-        filtered_data = filtered_data.head(show_count)
+    # Aplicar filtros e ordenação (reaproveita o resultado se nada mudou desde o último rerun)
+    list_key = (sort_option, min_frequency, show_count)
+    cached_list = st.session_state.get('_descricoes_ordenadas')
+    if cached_list is not None and cached_list[0] is frequency_analysis and cached_list[1] == list_key:
+        filtered_data = cached_list[2]
+    else:
+        filtered_data = frequency_analysis[frequency_analysis['Frequencia']
+                                           >= min_frequency]
+        limit = None if show_count == "Todos" else show_count
+
+        if sort_option == 'Alfabética':
+            filtered_data = filtered_data.sort_index(kind='stable')
+            if limit is not None:
+                filtered_data = filtered_data.head(limit)
+        else:
+            sort_column, ascending = DESCRIPTION_SORT_OPTIONS[sort_option]
+            if limit is None:
+                filtered_data = filtered_data.sort_values(
+                    sort_column, ascending=ascending, kind='stable')
+            elif ascending:
+                # Só as primeiras linhas são exibidas: seleção parcial em vez de ordenação completa
+                filtered_data = filtered_data.nsmallest(limit, sort_column)
+            else:
+                filtered_data = filtered_data.nlargest(limit, sort_column)
+
+        st.session_state['_descricoes_ordenadas'] = (
+            frequency_analysis, list_key, filtered_data)
 
     # Exibir tabela formatada
     st.dataframe(
-        filtered_data.style.format({
-            'Total_Gasto': 'R$ {:.2f}',
-            'Gasto_Medio': 'R$ {:.2f}',
-            'Frequencia': '{:.0f}',
-            'Primeira_Transacao': lambda x: x.strftime('%d/%m/%Y'),
-            'Ultima_Transacao': lambda x: x.strftime('%d/%m/%Y')
-        }),
+        filtered_data,
+        column_config=table_column_config(
+            money=['Total_Gasto', 'Gasto_Medio'],
+            dates=['Primeira_Transacao', 'Ultima_Transacao'],
+            integers=['Frequencia']),
         use_container_width=True,
         height=400
     )
@@ -1313,9 +1786,14 @@ def main():
     st.sidebar.title("⚙️ Configurações")
     st.sidebar.markdown("### 📁 Status dos Arquivos")
 
-    # Carregar dados
+    # Carregar dados (cache parquet evita reprocessar CSVs inalterados)
     with st.spinner("🔄 Carregando dados..."):
-        df, loaded_files, is_nubank_data = load_csv_files()
+        cached_df, loaded_files, is_nubank_data = load_processed_cache()
+        if cached_df is not None:
+            df = cached_df
+        else:
+            df, loaded_files, is_nubank_data = load_csv_files_cached(
+                get_csv_fingerprint(loaded_files))
 
     if df.empty:
         st.error("⚠️ **Nenhum dado encontrado!**")
@@ -1386,14 +1864,19 @@ def main():
         """, unsafe_allow_html=True)
 
     # Processar dados
-    with st.spinner("🔧 Processando dados financeiros..."):
-        try:
-            df = process_financial_data(df, is_nubank_data)
-        except Exception as e:
-            st.error(f"❌ Erro ao processar dados: {e}")
-            st.write("**Detalhes do erro:**")
-            st.exception(e)
-            return
+    data_fingerprint = get_csv_fingerprint(loaded_files)
+    if cached_df is None:
+        with st.spinner("🔧 Processando dados financeiros..."):
+            try:
+                df = process_financial_data_cached(
+                    df, is_nubank_data, data_fingerprint)
+            except Exception as e:
+                st.error(f"❌ Erro ao processar dados: {e}")
+                st.write("**Detalhes do erro:**")
+                st.exception(e)
+                return
+
+        save_processed_cache(df)
 
     if df.empty:
         st.error("❌ Erro ao processar os dados ou dados inválidos!")
@@ -1420,9 +1903,6 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-    # Análise mensal
-    monthly_analysis = create_monthly_analysis(df)
-
     # Filtros na sidebar
     st.sidebar.markdown("### 🔍 Filtros")
 
@@ -1453,41 +1933,63 @@ def main():
         step=10.0
     )
 
-    # Aplicar filtros
-    filtered_df = df.copy()
+    # Aplicar filtros: uma única máscara combinada e uma única seleção
+    mask = np.ones(len(df), dtype=bool)
 
-    # Filtro de data
+    # Filtro de data (comparação direta em datetime64, sem criar objetos date)
     if len(date_range) == 2:
         start_date, end_date = date_range
-        filtered_df = filtered_df[
-            (filtered_df['Data'].dt.date >= start_date) &
-            (filtered_df['Data'].dt.date <= end_date)
-        ]
-
-    # Filtro de categoria
-    if 'Todas' not in selected_categories and selected_categories:
-        filtered_df = filtered_df[filtered_df['Categoria'].isin(
-            selected_categories)]
+        start_ns = np.datetime64(start_date, 'ns')
+        end_ns = np.datetime64(end_date, 'ns') + np.timedelta64(1, 'D')
+        data_values = df['Data'].values
+        mask &= (data_values >= start_ns) & (data_values < end_ns)
+
+    # Filtro de categoria (selecionar todas individualmente equivale a 'Todas')
+    category_filter_active = (
+        bool(selected_categories)
+        and 'Todas' not in selected_categories
+        and not set(selected_categories).issuperset(categories[1:])
+    )
+    if category_filter_active:
+        mask &= df['Categoria'].isin(selected_categories).to_numpy()
 
     # Filtro de valor mínimo
     if min_value > 0:
-        filtered_df = filtered_df[filtered_df['Valor_Absoluto'] >= min_value]
+        mask &= df['Valor_Absoluto'].values >= min_value
+
+    filtered_df = df if mask.all() else df[mask]
+
+    # Horário do rerun, compartilhado pelos nomes de arquivo e cabeçalhos de download
+    render_time = datetime.now()
+    file_date_stamp = render_time.strftime('%Y%m%d')
+
+    # Chave das análises: arquivos de origem + estado dos filtros
+    filter_signature = (data_fingerprint, tuple(date_range),
+                        tuple(sorted(selected_categories)) if category_filter_active else None,
+                        min_value)
 
     # Recalcular análise mensal com dados filtrados
-    monthly_analysis_filtered = create_monthly_analysis(filtered_df)
+    monthly_analysis_filtered = create_monthly_analysis_cached(
+        filtered_df, filter_signature)
+
+    # Agregações de despesas reutilizadas pelos cards e gráficos
+    expense_aggregates = precompute_aggregates_cached(
+        filtered_df, filter_signature)
 
     # Cards de resumo financeiro
     if not filtered_df.empty and not monthly_analysis_filtered.empty:
         create_financial_summary_cards(
-            filtered_df, monthly_analysis_filtered, is_nubank_data)
+            filtered_df, monthly_analysis_filtered, is_nubank_data, expense_aggregates)
 
     st.markdown("---")
 
     # Criar visualizações
     if not monthly_analysis_filtered.empty:
+        tab_aggregates = get_tab_aggregates(filtered_df, filter_signature)
+
         try:
-            fig_monthly, fig_category, fig_fixed_var, fig_trends, fig_gauge = create_visualizations_nubank(
-                filtered_df, monthly_analysis_filtered, is_nubank_data
+            fig_monthly, fig_category, fig_fixed_var, fig_trends, fig_gauge = create_visualizations_cached(
+                filtered_df, monthly_analysis_filtered, is_nubank_data, expense_aggregates, filter_signature
             )
         except Exception as e:
             st.error(f"❌ Erro ao criar visualizações: {e}")
@@ -1537,14 +2039,13 @@ def main():
                 with col1:
                     st.subheader("🔒 Custos Fixos Identificados")
                     if 'Custo_Tipo' in filtered_df.columns:
-                        fixed_expenses = filtered_df[
-                            filtered_df['Custo_Tipo'] == 'Fixo'
-                        ].groupby('Descrição')['Valor_Absoluto'].mean().sort_values(ascending=False).head(10)
+                        fixed_expenses = tab_aggregates['fixed_expenses']
 
                         if not fixed_expenses.empty:
                             st.dataframe(
-                                fixed_expenses.to_frame('Valor Médio').style.format(
-                                    {'Valor Médio': 'R$ {:.2f}'}),
+                                fixed_expenses.to_frame('Valor Médio'),
+                                column_config=table_column_config(
+                                    money=['Valor Médio']),
                                 use_container_width=True
                             )
                         else:
@@ -1553,17 +2054,11 @@ def main():
                 with col2:
                     st.subheader("📊 Distribuição dos Gastos")
                     if 'Custo_Tipo' in filtered_df.columns:
-                        despesas_only = filtered_df[filtered_df['Tipo']
-                                                    == 'Despesa']
-                        summary = despesas_only.groupby(
-                            'Custo_Tipo')['Valor_Absoluto'].agg(['sum', 'mean', 'count'])
-                        summary.columns = ['Total', 'Média', 'Quantidade']
+                        summary = tab_aggregates['custo_summary']
                         st.dataframe(
-                            summary.style.format({
-                                'Total': 'R$ {:.2f}',
-                                'Média': 'R$ {:.2f}',
-                                'Quantidade': '{:.0f}'
-                            }),
+                            summary,
+                            column_config=table_column_config(
+                                money=['Total', 'Média'], integers=['Quantidade']),
                             use_container_width=True
                         )
             else:
@@ -1580,8 +2075,7 @@ def main():
             top_label = "🔝 Maiores Gastos do Período" if is_nubank_data else "🔝 Maiores Transações do Período"
             st.subheader(top_label)
 
-            despesas_filtered = filtered_df[filtered_df['Tipo'] == 'Despesa']
-            top_expenses = despesas_filtered.nlargest(15, 'Valor_Absoluto')
+            top_expenses = tab_aggregates['top_expenses']
 
             if not top_expenses.empty:
                 display_cols = ['Data', 'Descrição',
@@ -1590,16 +2084,16 @@ def main():
                     display_cols.append('Custo_Tipo')
 
                 st.dataframe(
-                    top_expenses[display_cols].style.format({
-                        'Data': lambda x: x.strftime('%d/%m/%Y'),
-                        'Valor_Absoluto': 'R$ {:.2f}'
-                    }),
+                    top_expenses[display_cols],
+                    column_config=table_column_config(
+                        money=['Valor_Absoluto'], dates=['Data']),
                     use_container_width=True
                 )
 
         # Tab 4 - Estabelecimentos/Detalhes
         with tab4:
-            show_expense_titles_analysis(filtered_df, is_nubank_data)
+            show_expense_titles_analysis(
+                filtered_df, is_nubank_data, tab_aggregates['descricoes'])
 
         # Tab 5 - Dados Brutos
         with tab5:
@@ -1618,7 +2112,7 @@ def main():
                     "Ordenar por", ['Data', 'Valor_Absoluto', 'Categoria'])
 
             # Preparar dados para exibição
-            display_df = filtered_df.copy()
+            display_df = filtered_df
 
             if not show_all:
                 display_df = display_df.head(rows_to_show)
@@ -1639,21 +2133,20 @@ def main():
                 cols_to_show.append('Custo_Tipo')
 
             st.dataframe(
-                display_df[cols_to_show].style.format({
-                    'Data': lambda x: x.strftime('%d/%m/%Y') if pd.notnull(x) else '',
-                    'Valor_Absoluto': 'R$ {:.2f}'
-                }),
+                display_df[cols_to_show],
+                column_config=table_column_config(
+                    money=['Valor_Absoluto'], dates=['Data']),
                 use_container_width=True,
                 height=400
             )
 
             # Botão de download
-            csv = filtered_df.to_csv(index=False)
+            csv = export_csv_bytes(filtered_df, filter_signature)
             file_prefix = "dados_nubank" if is_nubank_data else "dados_financeiros"
             st.download_button(
                 label="📥 Baixar dados (CSV)",
                 data=csv,
-                file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.csv",
+                file_name=f"{file_prefix}_{file_date_stamp}.csv",
                 mime="text/csv"
             )
 
@@ -1673,74 +2166,66 @@ def main():
                     st.write(
                         f"### 📊 Relatório Mensal - {('Nubank' if is_nubank_data else 'Financeiro')}")
 
-                    for _, row in monthly_analysis_filtered.iterrows():
-                        st.write(f"**Mês: {row['Mes_Str']}**")
+                    # Número de transações por mês em uma única passada
+                    counts_per_month = tab_aggregates['counts_per_month']
 
+                    # Relatório montado como um único bloco markdown (uma mensagem ao front-end)
+                    blocks = []
+                    for row in monthly_analysis_filtered.to_dict('records'):
+                        lines = []
                         if 'Despesa' in row:
-                            st.write(
+                            lines.append(
                                 f"- Total despesas: R$ {row['Despesa']:,.2f}")
                         if 'Receita' in row and row['Receita'] > 0:
-                            st.write(
+                            lines.append(
                                 f"- Total receitas: R$ {row['Receita']:,.2f}")
                         if 'Saldo' in row:
-                            st.write(f"- Saldo: R$ {row['Saldo']:,.2f}")
+                            lines.append(f"- Saldo: R$ {row['Saldo']:,.2f}")
+                        lines.append(
+                            f"- Transações: {counts_per_month.get(row['Mes_Str'], 0)}")
+
+                        blocks.append(
+                            f"**Mês: {row['Mes_Str']}**\n\n" + "\n".join(lines))
 
-                        # Calcular número de transações no mês
-                        month_transactions = filtered_df[filtered_df['Mes_Str']
-                                                         == row['Mes_Str']]
-                        st.write(f"- Transações: {len(month_transactions)}")
-                        st.write("---")
+                    st.markdown(render_report_blocks(blocks))
 
                 elif report_type in ["Estabelecimentos Frequentes", "Transações Frequentes"]:
                     st.write(f"### 🏪 Relatório de {report_type}")
 
-                    establishment_report = filtered_df.groupby('Descrição').agg({
-                        'Valor_Absoluto': ['sum', 'mean', 'count'],
-                        'Data': ['min', 'max']
-                    }).round(2)
-
-                    establishment_report.columns = [
-                        'Total_Gasto', 'Gasto_Medio', 'Frequencia', 'Primeira_Transacao', 'Ultima_Transacao']
-                    establishment_report = establishment_report.sort_values(
-                        'Frequencia', ascending=False).head(20)
-
-                    for desc, row in establishment_report.iterrows():
-                        st.write(f"**{desc}**")
-                        st.write(
-                            f"- Frequência: {int(row['Frequencia'])} vezes")
-                        st.write(f"- Total: R$ {row['Total_Gasto']:,.2f}")
-                        st.write(
-                            f"- Gasto médio: R$ {row['Gasto_Medio']:,.2f}")
-                        st.write(
-                            f"- Período: {row['Primeira_Transacao'].strftime('%d/%m/%Y')} até {row['Ultima_Transacao'].strftime('%d/%m/%Y')}")
-                        st.write("---")
+                    establishment_report = tab_aggregates['descricoes'].nlargest(
+                        20, 'Frequencia')
+
+                    blocks = [
+                        f"**{desc}**\n\n"
+                        f"- Frequência: {int(frequencia)} vezes\n"
+                        f"- Total: R$ {total:,.2f}\n"
+                        f"- Gasto médio: R$ {media:,.2f}\n"
+                        f"- Período: {primeira.strftime('%d/%m/%Y')} até {ultima.strftime('%d/%m/%Y')}"
+                        for desc, total, media, frequencia, primeira, ultima in establishment_report.itertuples(name=None)
+                    ]
+                    st.markdown(render_report_blocks(blocks))
 
                 elif report_type == "Por Categoria":
                     st.write("### 🏷️ Relatório por Categoria")
 
-                    despesas_filtered = filtered_df[filtered_df['Tipo']
-                                                    == 'Despesa']
-                    category_report = despesas_filtered.groupby('Categoria').agg({
-                        'Valor_Absoluto': ['sum', 'mean', 'count'],
-                        'Data': ['min', 'max']
-                    }).round(2)
-
-                    for categoria in category_report.index:
-                        st.write(f"**{categoria}**")
-                        st.write(
-                            f"- Total: R$ {category_report.loc[categoria, ('Valor_Absoluto', 'sum')]:,.2f}")
-                        st.write(
-                            f"- Gasto médio: R$ {category_report.loc[categoria, ('Valor_Absoluto', 'mean')]:,.2f}")
-                        st.write(
-                            f"- Número de transações: {category_report.loc[categoria, ('Valor_Absoluto', 'count')]:.0f}")
-                        st.write("---")
+                    category_flat = tab_aggregates['category_report']
+
+                    blocks = [
+                        f"**{categoria}**\n\n"
+                        f"- Total: R$ {total:,.2f}\n"
+                        f"- Gasto médio: R$ {media:,.2f}\n"
+                        f"- Número de transações: {quantidade:.0f}"
+                        for categoria, total, media, quantidade in category_flat[
+                            ['Categoria', 'sum', 'mean', 'count']].itertuples(index=False, name=None)
+                    ]
+                    st.markdown(render_report_blocks(blocks))
 
                 # Botão para exportar relatório
-                report_content = f"Relatório {report_type} - {'Nubank' if is_nubank_data else 'Financeiro'}\nGerado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
+                report_content = f"Relatório {report_type} - {'Nubank' if is_nubank_data else 'Financeiro'}\nGerado em {render_time.strftime('%d/%m/%Y %H:%M:%S')}"
                 st.download_button(
                     label="📥 Baixar Relatório (TXT)",
                     data=report_content,
-                    file_name=f"relatorio_{report_type.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.txt",
+                    file_name=f"relatorio_{report_type.lower().replace(' ', '_')}_{file_date_stamp}.txt",
                     mime="text/plain"
                 )
 
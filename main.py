@@ -18,11 +18,23 @@ import os
 import sys
 import subprocess
 import json
+import re
+import copy
+import csv
+import io
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
 import webbrowser
 import platform
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Adicionar pasta src ao path para imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -39,6 +51,176 @@ $$\   $$ |$$ |      $$ |  $$ |$$\   $$ |$$ |  $$ |  $$ |  $$ |\$  /$$ |$$ |  $$
  \______/ \__|      \__|  \__| \______/ \__|  \__|\______|\__|     \__| \______/           \_/     \______/ 
 """
 
+# JSON do config.json já lido, por (caminho, mtime_ns)
+_CONFIG_CACHE = {}
+
+
+def load_config_bytes(data: bytes) -> dict:
+    """Interpreta o conteúdo do config.json (orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def dump_config_bytes(config: dict) -> bytes:
+    """Serializa o config em JSON UTF-8 indentado (orjson quando disponível)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def config_snapshot(config: dict) -> bytes:
+    """Forma normalizada do config (chaves ordenadas) para comparar com o que está em disco"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(config, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(config, ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+GOOGLE_CREDENTIALS_PATH = "credentials/google_credentials.json"
+
+# Leitura parcial de CSV em check_data_availability
+CSV_HEAD_BYTES = 8192
+CSV_TAIL_BLOCK = 6144
+CSV_COUNT_CHUNK = 1 << 20
+# Quebra seguida de outra quebra: linha em branco (ignorada pelo read_csv)
+BLANK_LINE_RE = re.compile(rb'\n(?=\n)')
+
+
+def probe_csv_file(path) -> dict:
+    """Lê cabeçalho, primeira e última linha de um CSV e conta os registros sem montar um DataFrame"""
+    with open(path, 'rb') as f:
+        head = f.read(CSV_HEAD_BYTES)
+
+        # Contagem de linhas não vazias (como o read_csv) em blocos de 1 MB
+        f.seek(0)
+        line_count = 0
+        previous_byte = b'\n'
+        has_quotes = False
+        for block in iter(lambda: f.read(CSV_COUNT_CHUNK), b''):
+            if b'"' in block:
+                # Campo entre aspas pode conter quebra de linha: só o csv.reader conta certo
+                has_quotes = True
+                break
+            block = block.replace(b'\r', b'')
+            if not block:
+                continue
+            blank_lines = len(BLANK_LINE_RE.findall(block))
+            if previous_byte == b'\n' and block[:1] == b'\n':
+                blank_lines += 1
+            line_count += block.count(b'\n') - blank_lines
+            previous_byte = block[-1:]
+        if previous_byte != b'\n':
+            line_count += 1
+
+        if has_quotes:
+            f.seek(0)
+            text = io.TextIOWrapper(
+                f, encoding='utf-8-sig', errors='replace', newline='')
+            records = (row for row in csv.reader(text) if row)
+            columns = next(records, [])
+            first_row = next(records, [])
+            last_row = first_row
+            row_count = 1 if first_row else 0
+            for last_row in records:
+                row_count += 1
+            return {
+                "columns": columns,
+                "rows": row_count,
+                "first_row": first_row,
+                "last_row": last_row
+            }
+
+        # Última linha: volta do fim em blocos até achar a quebra anterior
+        position = f.tell()
+        tail = b''
+        while position > 0:
+            step = min(CSV_TAIL_BLOCK, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            if b'\n' in tail.rstrip(b'\r\n'):
+                break
+
+    head_records = (row for row in csv.reader(io.StringIO(
+        head.decode('utf-8-sig', errors='replace'), newline='')) if row)
+    columns = next(head_records, [])
+    first_row = next(head_records, [])
+    last_line = tail.rstrip(b'\r\n').rsplit(b'\n', 1)[-1]
+    last_row = next(csv.reader(
+        [last_line.decode('utf-8', errors='replace')]), []) if line_count > 1 else []
+
+    return {
+        "columns": columns,
+        "rows": max(line_count - 1, 0),
+        "first_row": first_row,
+        "last_row": last_row
+    }
+
+
+def module_available(name) -> bool:
+    """Verifica se um pacote está instalado sem executá-lo (importlib.util.find_spec)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def parse_sample_date(text):
+    """Interpreta uma data de extrato (AAAA-MM-DD do Nubank ou DD/MM/AAAA); None se inválida"""
+    text = text.strip()[:10]
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, '%d/%m/%Y')
+    except ValueError:
+        return None
+
+
+def scan_csv_folder(folder) -> list:
+    """Lista (caminho, mtime) dos CSVs de uma pasta com os.scandir"""
+    with os.scandir(folder) as entries:
+        return [(os.path.normpath(entry.path), entry.stat().st_mtime)
+                for entry in entries
+                if entry.name.endswith(".csv") and entry.is_file(follow_symlinks=False)]
+
+
+# Limpa a tela e volta o cursor ao topo
+CLEAR_SCREEN = "\033[2J\033[H"
+
+# Cores ANSI só quando a saída é um terminal; em arquivo ou pipe viram lixo
+STDOUT_IS_TTY = sys.stdout is not None and sys.stdout.isatty()
+ANSI_ESCAPE_RE = re.compile(r"\033\[[0-9;]*[A-Za-z]")
+
+
+def tty_text(text: str) -> str:
+    """Remove as sequências ANSI do texto quando a saída está redirecionada"""
+    return text if STDOUT_IS_TTY else ANSI_ESCAPE_RE.sub("", text)
+
+
+# Logo e cabeçalho da tela inicial, montados uma vez no carregamento do módulo
+WELCOME_BANNER = tty_text("\n".join([
+    "\033[96m" + LOGO + "\033[0m",
+    "\033[92m" + "="*100 + "\033[0m",
+    "\033[93m" + "         DASHBOARD FINANCEIRO PESSOAL COMPLETO v5.0".center(100) + "\033[0m",
+    "\033[94m" + "        🤖 IA INTEGRADA | ☁️ GOOGLE SHEETS AVANÇADO | 💳 NUBANK OTIMIZADO".center(100) + "\033[0m",
+    "\033[92m" + "="*100 + "\033[0m",
+]) + "\n")
+
+
+# Windows 10+: liga o processamento de sequências ANSI no console direto pela API (sem abrir cmd.exe)
+if os.name == 'nt':
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        stdout_handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        console_mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(stdout_handle, ctypes.byref(console_mode)):
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            kernel32.SetConsoleMode(stdout_handle, console_mode.value | 0x0004)
+    except Exception:
+        os.system("")
+
 # Importar função get_secret para variáveis sensíveis
 try:
     from config.settings import get_secret
@@ -77,7 +259,13 @@ class FinancialDashboardLauncherV5:
             'service_account': 'dashboard-financeiro@api-financeiro-460817.iam.gserviceaccount.com'
         }
 
+        # Config como está em disco (JSON normalizado); None força a primeira gravação
+        self._saved_snapshot = None
+        # (system_status, opções, texto) do menu principal já montado
+        self._main_menu_cache = None
         self.config = self.load_config()
+        # Mudanças pendentes no config (defaults novos, cache de dados); gravadas ao sair
+        self._config_dirty = self.config_changed()
         self.data_stats = self.check_data_availability()
         self.system_status = self.check_system_status()
 
@@ -132,8 +320,15 @@ class FinancialDashboardLauncherV5:
 
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                # Reaproveitar o JSON já lido enquanto o arquivo não mudar (mtime)
+                cache_key = (os.path.abspath(self.config_file),
+                             os.stat(self.config_file).st_mtime_ns)
+                if cache_key not in _CONFIG_CACHE:
+                    with open(self.config_file, 'rb') as f:
+                        _CONFIG_CACHE.clear()
+                        _CONFIG_CACHE[cache_key] = load_config_bytes(f.read())
+                config = copy.deepcopy(_CONFIG_CACHE[cache_key])
+                self._saved_snapshot = config_snapshot(config)
                 # Mesclar com defaults para novos campos v5.0
                 for key, value in default_config.items():
                     if key not in config:
@@ -151,13 +346,30 @@ class FinancialDashboardLauncherV5:
     def save_config(self):
         """Salva configuração"""
         try:
+            # Nada mudou desde a última leitura/gravação: não reescreve o arquivo
+            if not self.config_changed():
+                self._config_dirty = False
+                return
+
             self.config["project_info"]["last_updated"] = datetime.now(
             ).isoformat()
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            # Grava em arquivo temporário e troca de uma vez: um crash não deixa config.json vazio
+            temp_file = self.config_file + ".tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(dump_config_bytes(self.config))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.config_file)
+            self._saved_snapshot = config_snapshot(self.config)
+            self._config_dirty = False
         except Exception as e:
             print(f"⚠️ Erro ao salvar config: {e}")
 
+    def config_changed(self) -> bool:
+        """Indica se o config em memória difere do que está gravado em disco"""
+        return (not os.path.exists(self.config_file) or
+                config_snapshot(self.config) != self._saved_snapshot)
+
     def check_data_availability(self) -> dict:
         """Verifica disponibilidade de dados"""
         stats = {
@@ -167,66 +379,103 @@ class FinancialDashboardLauncherV5:
             "date_range": None,
             "categories_available": False,
             "folders_checked": [],
+            "folder_csv_counts": {},
             "recent_files": []
         }
 
-        # Procurar CSVs
+        # Procurar CSVs: lista de (caminho, mtime)
         csv_files = []
-        nubank_files = []
 
-        for folder in self.config["data_folders"]:
-            if os.path.exists(folder):
-                stats["folders_checked"].append(folder)
-                folder_csvs = list(Path(folder).glob("*.csv"))
-                csv_files.extend(folder_csvs)
+        folders = [folder for folder in self.config["data_folders"]
+                   if os.path.isdir(folder)]
+        stats["folders_checked"].extend(folders)
 
-                # Identificar arquivos do Nubank
-                nubank_pattern = list(Path(folder).glob("Nubank_*.csv"))
-                nubank_files.extend(nubank_pattern)
+        # Pastas listadas em paralelo (I/O); scandir já traz o stat de cada entrada
+        if folders:
+            with ThreadPoolExecutor(max_workers=len(folders)) as executor:
+                folder_files = list(executor.map(scan_csv_folder, folders))
+            csv_files = list(chain.from_iterable(folder_files))
+            stats["folder_csv_counts"] = {
+                folder: len(files) for folder, files in zip(folders, folder_files)}
+
+        # Identificar arquivos do Nubank
+        nubank_files = [path for path, _ in csv_files
+                        if os.path.basename(path).startswith("Nubank_")]
 
         stats["csv_files"] = len(csv_files)
         stats["nubank_files"] = len(nubank_files)
 
         # Arquivos mais recentes
         if csv_files:
-            csv_files_with_time = [(f, f.stat().st_mtime) for f in csv_files]
-            csv_files_with_time.sort(key=lambda x: x[1], reverse=True)
-            stats["recent_files"] = [str(f[0])
-                                     for f in csv_files_with_time[:5]]
+            csv_files_with_time = sorted(
+                csv_files, key=lambda x: x[1], reverse=True)
+            stats["recent_files"] = [f[0] for f in csv_files_with_time[:5]]
 
-            # Analisar arquivo de exemplo
+            # Analisar arquivo de exemplo; resultado guardado no config enquanto o arquivo não mudar
             try:
-                sample_file = csv_files[0]
-                sample_df = pd.read_csv(sample_file)
-
-                stats["total_transactions"] = len(sample_df)
-                stats["categories_available"] = 'Categoria' in sample_df.columns
-
-                # Detectar formato e datas
-                if all(col in sample_df.columns for col in ['date', 'title', 'amount']):
-                    # Formato Nubank
-                    sample_df['date'] = pd.to_datetime(
-                        sample_df['date'], errors='coerce')
-                    stats["date_range"] = {
-                        "start": sample_df['date'].min(),
-                        "end": sample_df['date'].max()
+                sample_file = csv_files[0][0]
+                sample_stat = os.stat(sample_file)
+                fingerprint = [sample_file,
+                               sample_stat.st_mtime_ns, sample_stat.st_size]
+
+                data_cache = self.config.get("data_cache") or {}
+                if data_cache.get("fingerprint") == fingerprint:
+                    sample_stats = data_cache["stats"]
+                else:
+                    sample_stats = self.analyze_sample_csv(sample_file)
+                    self.config["data_cache"] = {
+                        "fingerprint": fingerprint,
+                        "stats": sample_stats
                     }
-                    stats["format"] = "Nubank"
-                elif 'Data' in sample_df.columns:
-                    # Formato tradicional
-                    sample_df['Data'] = pd.to_datetime(
-                        sample_df['Data'], errors='coerce')
+                    self._config_dirty = True
+
+                stats.update(sample_stats)
+                if sample_stats.get("date_range"):
                     stats["date_range"] = {
-                        "start": sample_df['Data'].min(),
-                        "end": sample_df['Data'].max()
+                        key: datetime.fromisoformat(value)
+                        for key, value in sample_stats["date_range"].items()
                     }
-                    stats["format"] = "Tradicional"
 
             except Exception as e:
                 stats["error"] = str(e)
 
         return stats
 
+    def analyze_sample_csv(self, sample_file) -> dict:
+        """Estatísticas do CSV de exemplo (só cabeçalho, extremos e contagem de linhas), em formato JSON"""
+        probe = probe_csv_file(sample_file)
+        columns = probe["columns"]
+
+        sample_stats = {
+            "total_transactions": probe["rows"],
+            "categories_available": 'Categoria' in columns
+        }
+
+        # Detectar formato; extratos vêm ordenados, então as datas extremas estão na primeira e na última linha
+        date_column = None
+        if all(col in columns for col in ['date', 'title', 'amount']):
+            date_column = 'date'
+            sample_stats["format"] = "Nubank"
+        elif 'Data' in columns:
+            date_column = 'Data'
+            sample_stats["format"] = "Tradicional"
+
+        if date_column:
+            index = columns.index(date_column)
+            edge_dates = [
+                parsed for parsed in (
+                    parse_sample_date(row[index])
+                    for row in (probe["first_row"], probe["last_row"])
+                    if len(row) > index)
+                if parsed is not None]
+            if edge_dates:
+                sample_stats["date_range"] = {
+                    "start": min(edge_dates).isoformat(),
+                    "end": max(edge_dates).isoformat()
+                }
+
+        return sample_stats
+
     def check_system_status(self) -> dict:
         """Verifica status do sistema"""
         status = {
@@ -239,19 +488,15 @@ class FinancialDashboardLauncherV5:
             "ai_ready": False
         }
 
-        # Verificar módulos
+        # Verificar módulos e credenciais (um stat por caminho)
+        existing = {path: os.path.exists(path)
+                    for path in list(self.modules.values()) + [GOOGLE_CREDENTIALS_PATH]}
         for module_name, module_path in self.modules.items():
-            status["modules_available"][module_name] = os.path.exists(
-                module_path)
+            status["modules_available"][module_name] = existing[module_path]
 
-        # Verificar dependências críticas
-        try:
-            import streamlit
-            import pandas
-            import plotly
-            status["dependencies_ok"] = True
-        except ImportError:
-            status["dependencies_ok"] = False
+        # Verificar dependências críticas (só localiza, sem importar)
+        status["dependencies_ok"] = all(
+            module_available(dep) for dep in ['streamlit', 'pandas', 'plotly'])
 
         # Verificar CSS otimizado
         css_path = Path("css/dashboard_styles.css")
@@ -264,7 +509,7 @@ class FinancialDashboardLauncherV5:
             "chatbot", False)
 
         # Verificar Google Sheets
-        creds_exist = os.path.exists("credentials/google_credentials.json")
+        creds_exist = existing[GOOGLE_CREDENTIALS_PATH]
         basic_module = status["modules_available"].get("sync_basic", False)
         advanced_module = status["modules_available"].get(
             "sync_advanced", False)
@@ -284,47 +529,45 @@ class FinancialDashboardLauncherV5:
 
         return status
 
+    def module_ready(self, module_name) -> bool:
+        """Disponibilidade do módulo segundo o último check_system_status (sem novo stat)"""
+        return self.system_status["modules_available"].get(module_name, False)
+
     def show_welcome_screen_v5(self):
         """Exibe tela de boas-vindas v5.0"""
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-        print("\033[96m" + LOGO + "\033[0m")
-        print("\033[92m" + "="*100 + "\033[0m")
-        print(
-            "\033[93m" + "         DASHBOARD FINANCEIRO PESSOAL COMPLETO v5.0".center(100) + "\033[0m")
-        print("\033[94m" + "        🤖 IA INTEGRADA | ☁️ GOOGLE SHEETS AVANÇADO | 💳 NUBANK OTIMIZADO".center(100) + "\033[0m")
-        print("\033[92m" + "="*100 + "\033[0m")
+        # Só a parte dinâmica é formatada aqui; o banner já vem pronto
+        lines = []
 
         # Emails configurados
-        print(f"\n📧 EMAILS CONFIGURADOS:")
-        print(f"   • Principal: {self.emails['primary']}")
-        print(f"   • Service Account: {self.emails['service_account']}")
+        lines.append(f"\n📧 EMAILS CONFIGURADOS:")
+        lines.append(f"   • Principal: {self.emails['primary']}")
+        lines.append(f"   • Service Account: {self.emails['service_account']}")
 
         # Novidades v5.0
-        print(f"\n🎉 FUNCIONALIDADES v5.0:")
-        print(f"   🤖 Chatbot IA integrado - Converse sobre seus gastos")
-        print(f"   ☁️ Google Sheets avançado - Planilhas organizadas por ano/mês automaticamente")
-        print(f"   🎨 CSS otimizado v3 - Legibilidade perfeita em todos os temas")
-        print(f"   🧭 Menu unificado - Navegação integrada no dashboard")
-        print(f"   📊 Botão direto Google Sheets - Acesso rápido às planilhas")
-        print(f"   🔧 Configuração automática - Setup completo em um comando")
+        lines.append(f"\n🎉 FUNCIONALIDADES v5.0:")
+        lines.append(f"   🤖 Chatbot IA integrado - Converse sobre seus gastos")
+        lines.append(f"   ☁️ Google Sheets avançado - Planilhas organizadas por ano/mês automaticamente")
+        lines.append(f"   🎨 CSS otimizado v3 - Legibilidade perfeita em todos os temas")
+        lines.append(f"   🧭 Menu unificado - Navegação integrada no dashboard")
+        lines.append(f"   📊 Botão direto Google Sheets - Acesso rápido às planilhas")
+        lines.append(f"   🔧 Configuração automática - Setup completo em um comando")
 
         # Status do sistema
-        print(f"\n📊 STATUS DO SISTEMA:")
-        print(
+        lines.append(f"\n📊 STATUS DO SISTEMA:")
+        lines.append(
             f"   • Arquivos CSV: {self.data_stats.get('csv_files', 0)} (Nubank: {self.data_stats.get('nubank_files', 0)})")
-        print(
+        lines.append(
             f"   • Transações estimadas: {self.data_stats.get('total_transactions', 0):,}")
 
+        # date_range só é preenchido com datas válidas
         if self.data_stats.get('date_range'):
             start = self.data_stats['date_range']['start']
             end = self.data_stats['date_range']['end']
-            if pd.notna(start) and pd.notna(end):
-                print(
-                    f"   • Período: {start.strftime('%d/%m/%Y')} até {end.strftime('%d/%m/%Y')}")
+            lines.append(
+                f"   • Período: {start.strftime('%d/%m/%Y')} até {end.strftime('%d/%m/%Y')}")
 
         # Status dos módulos v5.0
-        print(f"\n🔧 FUNCIONALIDADES v5.0:")
+        lines.append(f"\n🔧 FUNCIONALIDADES v5.0:")
 
         features = [
             ("📊 Dashboard Principal",
@@ -344,37 +587,41 @@ class FinancialDashboardLauncherV5:
 
         for feature_name, status in features:
             status_icon = "✅" if status else "❌"
-            print(f"   • {feature_name}: {status_icon}")
+            lines.append(f"   • {feature_name}: {status_icon}")
 
         # Status das integrações
-        print(f"\n🔧 INTEGRAÇÕES:")
-        print(
+        lines.append(f"\n🔧 INTEGRAÇÕES:")
+        lines.append(
             f"   • Google Sheets Básico: {'✅ Configurado' if self.system_status['google_sheets_basic'] else '❌ Não configurado'}")
-        print(
+        lines.append(
             f"   • Google Sheets Avançado: {'✅ Configurado' if self.system_status['google_sheets_advanced'] else '❌ Não configurado'}")
-        print(
+        lines.append(
             f"   • IA (Groq/OpenAI): {'✅ Configurada' if self.system_status['ai_ready'] else '❌ Não configurada'}")
 
         # Dados Nubank
         if self.data_stats.get('nubank_files', 0) > 0:
-            print(f"\n💳 DADOS NUBANK DETECTADOS:")
-            print(
+            lines.append(f"\n💳 DADOS NUBANK DETECTADOS:")
+            lines.append(
                 f"   • {self.data_stats['nubank_files']} arquivos Nubank_*.csv")
-            print(f"   • Análise otimizada disponível")
-            print(f"   • Chatbot especializado ativo")
-            print(f"   • Google Sheets automático com organização por período")
+            lines.append(f"   • Análise otimizada disponível")
+            lines.append(f"   • Chatbot especializado ativo")
+            lines.append(f"   • Google Sheets automático com organização por período")
 
         # Configuração inicial
         if self.config.get("first_run", True):
-            print(f"\n🎯 PRIMEIRA EXECUÇÃO DETECTADA:")
-            print(
+            lines.append(f"\n🎯 PRIMEIRA EXECUÇÃO DETECTADA:")
+            lines.append(
                 f"   Recomendamos executar a configuração automática para otimizar o sistema.")
 
-    def show_main_menu_v5(self):
-        """Exibe menu principal v5.0"""
-        print(f"\n" + "="*80)
-        print("MENU PRINCIPAL v5.0 - COMPLETO COM GOOGLE SHEETS AVANÇADO")
-        print("="*80)
+        # Limpeza de tela, banner e status numa única escrita
+        screen = CLEAR_SCREEN if STDOUT_IS_TTY else ""
+        sys.stdout.write(screen + WELCOME_BANNER + "\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+    def build_main_menu_v5(self):
+        """Monta opções e texto colorido do menu uma vez por status do sistema"""
+        if self._main_menu_cache and self._main_menu_cache[0] is self.system_status:
+            return self._main_menu_cache[1], self._main_menu_cache[2]
 
         options = [
             # Funcionalidades principais
@@ -413,6 +660,7 @@ class FinancialDashboardLauncherV5:
             ("0", "❌ Sair", "exit", True)
         ]
 
+        lines = ["", "="*80, "MENU PRINCIPAL v5.0 - COMPLETO COM GOOGLE SHEETS AVANÇADO", "="*80]
         for num, title, action, enabled in options:
             if not enabled:
                 if action in ['categorize', 'analyze']:
@@ -427,9 +675,18 @@ class FinancialDashboardLauncherV5:
                 status = ""
 
             color = "\033[92m" if enabled else "\033[91m"
-            print(f"{color}{num:>2}. {title}{status}\033[0m")
+            lines.append(f"{color}{num:>2}. {title}{status}\033[0m")
+        lines.append("="*80)
 
-        print("="*80)
+        menu_text = tty_text("\n".join(lines) + "\n")
+        self._main_menu_cache = (self.system_status, options, menu_text)
+        return options, menu_text
+
+    def show_main_menu_v5(self):
+        """Exibe menu principal v5.0"""
+        # Texto pré-montado: um único write por redesenho
+        options, menu_text = self.build_main_menu_v5()
+        sys.stdout.write(menu_text)
 
         # Sugestões baseadas no status
         if self.config.get("first_run", True):
@@ -530,7 +787,7 @@ class FinancialDashboardLauncherV5:
             return
 
         basic_module = self.modules.get('sync_basic')
-        if not basic_module or not os.path.exists(basic_module):
+        if not self.module_ready('sync_basic'):
             print("❌ Módulo básico não encontrado!")
             print("💡 Verifique se google_sheets_sync.py está em src/")
             input("Pressione Enter para continuar...")
@@ -558,7 +815,7 @@ class FinancialDashboardLauncherV5:
             return
 
         advanced_module = self.modules.get('sync_advanced')
-        if not advanced_module or not os.path.exists(advanced_module):
+        if not self.module_ready('sync_advanced'):
             print("❌ Módulo avançado não encontrado!")
             print("💡 Verifique se google_sheets_advanced.py está em src/")
             input("Pressione Enter para continuar...")
@@ -580,7 +837,7 @@ class FinancialDashboardLauncherV5:
         print("   • Configura emails automaticamente")
 
         auto_setup_file = self.modules.get('auto_setup')
-        if not auto_setup_file or not os.path.exists(auto_setup_file):
+        if not self.module_ready('auto_setup'):
             print("❌ Script de configuração não encontrado!")
             print("💡 Certifique-se de ter auto_setup.py na raiz")
             input("Pressione Enter para continuar...")
@@ -591,8 +848,12 @@ class FinancialDashboardLauncherV5:
             print("✅ Configuração automática concluída!")
             print("🔄 Reiniciando para aplicar mudanças...")
 
+            # Pacotes instalados pelo setup precisam aparecer no find_spec
+            importlib.invalidate_caches()
+
             # Recarregar configurações
             self.config = self.load_config()
+            self._config_dirty = self.config_changed()
             self.system_status = self.check_system_status()
 
         except Exception as e:
@@ -667,9 +928,11 @@ class FinancialDashboardLauncherV5:
             print(
                 f"   • Pastas verificadas: {len(self.data_stats.get('folders_checked', []))}")
 
+            # Contagens da varredura de check_data_availability (sem listar as pastas de novo)
+            folder_csv_counts = self.data_stats.get('folder_csv_counts', {})
             for folder in self.data_stats.get('folders_checked', []):
-                csv_count = len(list(Path(folder).glob("*.csv")))
-                print(f"     - {folder}: {csv_count} arquivos")
+                print(
+                    f"     - {folder}: {folder_csv_counts.get(folder, 0)} arquivos")
 
             print(f"   • Emails configurados: {len(self.emails)}")
             print(f"     - Principal: {self.emails['primary']}")
@@ -863,11 +1126,7 @@ class FinancialDashboardLauncherV5:
             print("\n📦 Dependências:")
             deps = ['streamlit', 'pandas', 'plotly', 'gspread']
             for dep in deps:
-                try:
-                    __import__(dep)
-                    print(f"   ✅ {dep}")
-                except ImportError:
-                    print(f"   ❌ {dep}")
+                print(f"   {'✅' if module_available(dep) else '❌'} {dep}")
 
             # Testar IA
             print("\n🤖 IA:")
@@ -957,14 +1216,15 @@ class FinancialDashboardLauncherV5:
                 elif action == "help":
                     self.show_help_v5()
 
-                # Salvar configuração após cada ação
-                self.save_config()
-
         except KeyboardInterrupt:
             print("\n\n👋 Saindo do Dashboard Financeiro v5.0...")
         except Exception as e:
             print(f"\n❌ Erro inesperado: {e}")
             print("💡 Execute diagnóstico: python system_checker.py")
+        finally:
+            # Uma única gravação ao sair, só se algo mudou
+            if self._config_dirty:
+                self.save_config()
 
     # Métodos legados mantidos para compatibilidade
     def execute_categorization(self):
@@ -972,7 +1232,7 @@ class FinancialDashboardLauncherV5:
         print("\n🤖 Iniciando Categorização Automática...")
 
         categorizer_file = self.modules['categorizer']
-        if not os.path.exists(categorizer_file):
+        if not self.module_ready('categorizer'):
             print(f"❌ Módulo não encontrado: {categorizer_file}")
             input("Pressione Enter para continuar...")
             return
@@ -988,7 +1248,7 @@ class FinancialDashboardLauncherV5:
         print("\n📈 Iniciando Análise Avançada...")
 
         analytics_file = self.modules['analytics']
-        if not os.path.exists(analytics_file):
+        if not self.module_ready('analytics'):
             print(f"❌ Módulo não encontrado: {analytics_file}")
             input("Pressione Enter para continuar...")
             return
@@ -1004,7 +1264,7 @@ class FinancialDashboardLauncherV5:
         print("\n🔍 Diagnóstico Completo do Sistema...")
 
         system_check_file = self.modules.get('system_check')
-        if not system_check_file or not os.path.exists(system_check_file):
+        if not self.module_ready('system_check'):
             print("❌ Script de diagnóstico não encontrado!")
             print("💡 Verifique se system_checker.py está na raiz")
             input("Pressione Enter para continuar...")
@@ -1022,11 +1282,17 @@ def main():
     launcher = FinancialDashboardLauncherV5()
     launcher.run()
 
+# ===== SCRIPTS DE CONVENIÊNCIA v5.0 =====
 
-if __name__ == "__main__":
-    main()
 
-# ===== SCRIPTS DE CONVENIÊNCIA v5.0 =====
+def exec_module_command(args):
+    """Substitui o processo do launcher pelo comando (os.execv) quando não há menu para voltar"""
+    command = [sys.executable] + args
+    if os.name == 'posix':
+        sys.stdout.flush()
+        os.execv(sys.executable, command)
+    # Windows: execv não preserva o console, então mantém o processo filho
+    subprocess.run(command)
 
 
 def quick_start_v5():
@@ -1043,29 +1309,27 @@ def quick_start_v5():
 
     if choice == "1":
         if os.path.exists("dashboard.py"):
-            subprocess.run(
-                [sys.executable, "-m", "streamlit", "run", "dashboard.py"])
+            exec_module_command(["-m", "streamlit", "run", "dashboard.py"])
         else:
             print("❌ dashboard.py não encontrado")
     elif choice == "2":
         if os.path.exists("chatbot.py"):
-            subprocess.run(
-                [sys.executable, "-m", "streamlit", "run", "chatbot.py"])
+            exec_module_command(["-m", "streamlit", "run", "chatbot.py"])
         else:
             print("❌ chatbot.py não encontrado")
     elif choice == "3":
         if os.path.exists("src/google_sheets_sync.py"):
-            subprocess.run([sys.executable, "src/google_sheets_sync.py"])
+            exec_module_command(["src/google_sheets_sync.py"])
         else:
             print("❌ src/google_sheets_sync.py não encontrado")
     elif choice == "4":
         if os.path.exists("src/google_sheets_advanced.py"):
-            subprocess.run([sys.executable, "src/google_sheets_advanced.py"])
+            exec_module_command(["src/google_sheets_advanced.py"])
         else:
             print("❌ src/google_sheets_advanced.py não encontrado")
     elif choice == "5":
         if os.path.exists("auto_setup.py"):
-            subprocess.run([sys.executable, "auto_setup.py"])
+            exec_module_command(["auto_setup.py"])
         else:
             print("❌ auto_setup.py não encontrado")
 
@@ -1084,27 +1348,29 @@ def check_system_v5():
         "🎨 Interface": ["css/dashboard_styles.css"]
     }
 
+    # Todos os caminhos verificados de uma vez (um stat por caminho)
+    existing = {path: os.path.exists(path)
+                for path in [file for files in v5_files.values() for file in files] + [GOOGLE_CREDENTIALS_PATH]}
+
     for category, files in v5_files.items():
         print(f"\n{category}:")
         for file in files:
-            status = "✅" if os.path.exists(file) else "❌"
+            status = "✅" if existing[file] else "❌"
             print(f"   {status} {file}")
 
     # Funcionalidades v5.0
     print(f"\n🚀 FUNCIONALIDADES v5.0:")
 
     # Chatbot
-    chatbot_ready = os.path.exists("chatbot.py")
+    chatbot_ready = existing["chatbot.py"]
     print(f"   🤖 Chatbot IA: {'✅' if chatbot_ready else '❌'}")
 
     # Google Sheets básico
-    sheets_basic = os.path.exists(
-        "src/google_sheets_sync.py") and os.path.exists("credentials/google_credentials.json")
+    sheets_basic = existing["src/google_sheets_sync.py"] and existing[GOOGLE_CREDENTIALS_PATH]
     print(f"   ☁️ Google Sheets Básico: {'✅' if sheets_basic else '❌'}")
 
     # Google Sheets avançado
-    sheets_advanced = os.path.exists(
-        "src/google_sheets_advanced.py") and os.path.exists("credentials/google_credentials.json")
+    sheets_advanced = existing["src/google_sheets_advanced.py"] and existing[GOOGLE_CREDENTIALS_PATH]
     print(f"   🚀 Google Sheets Avançado: {'✅' if sheets_advanced else '❌'}")
 
     # CSS otimizado
@@ -1132,31 +1398,30 @@ def check_system_v5():
 
 
 # Para execução direta com parâmetros v5.0
-if len(sys.argv) > 1:
-    command = sys.argv[1].lower()
-
-    if command == "quick":
-        quick_start_v5()
-    elif command == "check":
-        check_system_v5()
-    elif command == "dashboard":
-        if os.path.exists("dashboard.py"):
-            subprocess.run(
-                [sys.executable, "-m", "streamlit", "run", "dashboard.py"])
-    elif command == "chatbot":
-        if os.path.exists("chatbot.py"):
-            subprocess.run(
-                [sys.executable, "-m", "streamlit", "run", "chatbot.py"])
-    elif command == "sheets":
-        if os.path.exists("src/google_sheets_advanced.py"):
-            subprocess.run([sys.executable, "src/google_sheets_advanced.py"])
-        elif os.path.exists("src/google_sheets_sync.py"):
-            subprocess.run([sys.executable, "src/google_sheets_sync.py"])
-    elif command == "setup":
-        if os.path.exists("auto_setup.py"):
-            subprocess.run([sys.executable, "auto_setup.py"])
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        command = sys.argv[1].lower()
+
+        if command == "quick":
+            quick_start_v5()
+        elif command == "check":
+            check_system_v5()
+        elif command == "dashboard":
+            if os.path.exists("dashboard.py"):
+                exec_module_command(["-m", "streamlit", "run", "dashboard.py"])
+        elif command == "chatbot":
+            if os.path.exists("chatbot.py"):
+                exec_module_command(["-m", "streamlit", "run", "chatbot.py"])
+        elif command == "sheets":
+            if os.path.exists("src/google_sheets_advanced.py"):
+                exec_module_command(["src/google_sheets_advanced.py"])
+            elif os.path.exists("src/google_sheets_sync.py"):
+                exec_module_command(["src/google_sheets_sync.py"])
+        elif command == "setup":
+            if os.path.exists("auto_setup.py"):
+                exec_module_command(["auto_setup.py"])
+        else:
+            print(f"Comando desconhecido: {command}")
+            print("Comandos v5.0: quick, check, dashboard, chatbot, sheets, setup")
     else:
-        print(f"Comando desconhecido: {command}")
-        print("Comandos v5.0: quick, check, dashboard, chatbot, sheets, setup")
-else:
-    main()
+        main()
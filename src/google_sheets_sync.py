@@ -5,12 +5,20 @@ Execute: python google_sheets_sync.py
 """
 
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import numpy as np
 import os
 from datetime import datetime
-import glob
+import importlib.util
 import json
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Só verifica se o pyarrow está instalado, sem carregá-lo
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
 try:
     from config.settings import get_secret
 except ImportError:
@@ -18,6 +26,95 @@ except ImportError:
         import os
         return os.getenv(key, default)
 
+GOOGLE_SCOPES = (
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+)
+
+# Erros da API do Sheets que valem nova tentativa (cota e indisponibilidade)
+RETRY_STATUS_CODES = (429, 500, 503)
+MAX_API_TRIES = 6
+
+# Conexões mantidas abertas na sessão HTTPS do cliente gspread
+HTTP_POOL_SIZE = 10
+
+# Pastas onde load_financial_data procura extratos CSV
+CSV_SEARCH_DIRS = ('.', 'data', 'data/raw', 'extratos')
+
+# Leituras de CSV simultâneas em load_financial_data (I/O, libera o GIL)
+CSV_READ_WORKERS = 8
+
+
+def dataframe_to_values(df):
+    """Converte o DataFrame em lista de listas de texto no formato esperado pelo Sheets"""
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            text = series.dt.strftime("%d/%m/%Y")
+        else:
+            text = series.astype(str)
+        # Valores ausentes viram célula vazia
+        columns[col] = text.where(series.notna(), "")
+    return pd.DataFrame(columns, index=df.index).values.tolist()
+
+
+def header_format_request(sheet_id, num_columns):
+    """Requisição batchUpdate que formata a linha de cabeçalho de uma aba"""
+    return {'repeatCell': {
+        'range': {
+            'sheetId': sheet_id,
+            'startRowIndex': 0, 'endRowIndex': 1,
+            'startColumnIndex': 0, 'endColumnIndex': num_columns
+        },
+        'cell': {'userEnteredFormat': {
+            'backgroundColor': {'red': 0.2, 'green': 0.4, 'blue': 0.8},
+            'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}},
+            'horizontalAlignment': 'CENTER'
+        }},
+        'fields': 'userEnteredFormat(backgroundColor,textFormat,horizontalAlignment)'
+    }}
+
+
+def call_with_backoff(func, *args, **kwargs):
+    """Executa uma chamada à API do Sheets com espera exponencial em 429/5xx (respeita Retry-After)"""
+    import gspread
+    for attempt in range(MAX_API_TRIES):
+        try:
+            return func(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            response = getattr(e, 'response', None)
+            status = getattr(response, 'status_code', None)
+            if status not in RETRY_STATUS_CODES or attempt == MAX_API_TRIES - 1:
+                raise
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt + random.random()
+            print(f"⏳ API do Google respondeu {status}, nova tentativa em {delay:.1f}s...")
+            time.sleep(delay)
+
+
+@lru_cache(maxsize=1)
+def authorize_client(creds_json=None, credentials_path=None, mtime=None):
+    """Autoriza o cliente gspread uma vez por processo (chave: segredo ou arquivo + mtime)"""
+    # Bibliotecas de rede importadas só quando há sincronização de fato
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    if creds_json:
+        creds = Credentials.from_service_account_info(
+            json.loads(creds_json), scopes=GOOGLE_SCOPES)
+    else:
+        creds = Credentials.from_service_account_file(
+            credentials_path, scopes=GOOGLE_SCOPES)
+
+    # Sessão HTTPS persistente: as chamadas seguintes reaproveitam a conexão TLS
+    session = AuthorizedSession(creds)
+    session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                          pool_maxsize=HTTP_POOL_SIZE))
+    return gspread.Client(auth=creds, session=session)
+
 
 class GoogleSheetsSync:
     def __init__(self, credentials_path="credentials/google_credentials.json"):
@@ -43,28 +140,18 @@ class GoogleSheetsSync:
         """Conecta com Google Sheets API"""
         try:
             # Verificar se arquivo de credenciais existe
-            scopes = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive",
-            ]
             creds_json = get_secret("GOOGLE_CREDENTIALS_JSON")
             if creds_json:
-                creds_dict = json.loads(creds_json)
-                from oauth2client.service_account import ServiceAccountCredentials
-                creds = ServiceAccountCredentials.from_json_keyfile_dict(
-                    creds_dict, scopes=scopes)
+                self.client = authorize_client(creds_json=creds_json)
             elif os.path.exists(self.credentials_path):
-                from oauth2client.service_account import ServiceAccountCredentials
-                creds = ServiceAccountCredentials.from_json_keyfile_name(
-                    filename=self.credentials_path,
-                    scopes=scopes
+                self.client = authorize_client(
+                    credentials_path=self.credentials_path,
+                    mtime=os.path.getmtime(self.credentials_path)
                 )
             else:
                 print(
                     f"❌ Credenciais do Google não encontradas nem no secrets.toml nem no arquivo físico: {self.credentials_path}")
                 return False
-            import gspread
-            self.client = gspread.authorize(creds)
             print("✅ Conectado ao Google Sheets com sucesso!")
             print(
                 f"📧 Compartilhamento automático ativo para: {', '.join(self.share_emails)}")
@@ -84,6 +171,7 @@ class GoogleSheetsSync:
             print("❌ Cliente não conectado")
             return False
 
+        import gspread
         try:
             # Tentar abrir planilha existente
             try:
@@ -133,15 +221,23 @@ class GoogleSheetsSync:
             print("❌ Planilha não inicializada")
             return False
 
+        import gspread
         try:
             # Criar ou obter worksheet
+            requests = []
             try:
-                worksheet = self.spreadsheet.worksheet(worksheet_name)
+                worksheet = call_with_backoff(
+                    self.spreadsheet.worksheet, worksheet_name)
                 if clear_first:
-                    worksheet.clear()
+                    # Limpeza vai junto com a formatação em uma única requisição
+                    requests.append({'updateCells': {
+                        'range': {'sheetId': worksheet.id},
+                        'fields': 'userEnteredValue'
+                    }})
             except gspread.WorksheetNotFound:
                 # Criar nova aba
-                worksheet = self.spreadsheet.add_worksheet(
+                worksheet = call_with_backoff(
+                    self.spreadsheet.add_worksheet,
                     title=worksheet_name,
                     rows=len(df) + 10,
                     cols=len(df.columns) + 5
@@ -151,40 +247,20 @@ class GoogleSheetsSync:
             # Cabeçalhos
             headers = df.columns.tolist()
 
-            # Converter dados para lista de listas
-            data = []
-            data.append(headers)  # Adicionar cabeçalhos
-
-            for index, row in df.iterrows():
-                row_data = []
-                for col in df.columns:
-                    value = row[col]
-
-                    # Tratar diferentes tipos de dados
-                    if pd.isna(value):
-                        row_data.append("")
-                    elif isinstance(value, datetime):
-                        row_data.append(value.strftime("%d/%m/%Y"))
-                    elif hasattr(value, 'strftime'):  # Period, Date, etc.
-                        try:
-                            row_data.append(str(value))
-                        except:
-                            row_data.append("")
-                    else:
-                        row_data.append(str(value))
-
-                data.append(row_data)
-
-            # Upload dados
-            worksheet.update(data, value_input_option='USER_ENTERED')
-
-            # Formatação básica do cabeçalho
-            header_range = f"A1:{chr(65 + len(headers) - 1)}1"
-            worksheet.format(header_range, {
-                'backgroundColor': {'red': 0.2, 'green': 0.4, 'blue': 0.8},
-                'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}},
-                'horizontalAlignment': 'CENTER'
-            })
+            # Converter dados para lista de listas (uma conversão vetorizada por coluna)
+            data = [headers] + dataframe_to_values(df)
+
+            # Limpeza + formatação básica do cabeçalho, depois os valores
+            requests.append(header_format_request(worksheet.id, len(headers)))
+            call_with_backoff(self.spreadsheet.batch_update,
+                              {'requests': requests})
+            # Corpo já serializado direto para values.update (sem o caminho de células do gspread)
+            call_with_backoff(
+                self.spreadsheet.values_update,
+                f"'{worksheet_name}'!A1",
+                params={'valueInputOption': 'USER_ENTERED'},
+                body={'values': data}
+            )
 
             print(
                 f"✅ Dados enviados para aba '{worksheet_name}' ({len(df)} linhas)")
@@ -194,6 +270,68 @@ class GoogleSheetsSync:
             print(f"❌ Erro ao fazer upload: {e}")
             return False
 
+    def upload_dataframes_batch(self, pending):
+        """
+        Envia vários DataFrames em poucas requisições (criação, limpeza, valores e formatação em lote)
+
+        Args:
+            pending: Lista de tuplas (nome da aba, DataFrame)
+
+        Returns:
+            True se o envio em lote foi concluído; False para usar o envio aba a aba
+        """
+        if not self.spreadsheet:
+            print("❌ Planilha não inicializada")
+            return False
+
+        try:
+            existing = {
+                worksheet.title: worksheet.id for worksheet in call_with_backoff(self.spreadsheet.worksheets)}
+
+            # 1. Criar as abas que faltam em uma única requisição
+            add_requests = [
+                {'addSheet': {'properties': {
+                    'title': worksheet_name,
+                    'gridProperties': {'rowCount': len(df) + 10, 'columnCount': len(df.columns) + 5}
+                }}}
+                for worksheet_name, df in pending if worksheet_name not in existing
+            ]
+            if add_requests:
+                response = call_with_backoff(
+                    self.spreadsheet.batch_update, {'requests': add_requests})
+                for reply in response.get('replies', []):
+                    properties = reply['addSheet']['properties']
+                    existing[properties['title']] = properties['sheetId']
+
+            # 2. Limpar as abas e gravar todos os valores
+            ranges = [f"'{worksheet_name}'" for worksheet_name, _ in pending]
+            call_with_backoff(self.spreadsheet.values_batch_clear,
+                              body={'ranges': ranges})
+            call_with_backoff(self.spreadsheet.values_batch_update, body={
+                'valueInputOption': 'USER_ENTERED',
+                'data': [
+                    {'range': f"'{worksheet_name}'!A1",
+                     'values': [df.columns.tolist()] + dataframe_to_values(df)}
+                    for worksheet_name, df in pending
+                ]
+            })
+
+            # 3. Formatar os cabeçalhos de todas as abas
+            call_with_backoff(self.spreadsheet.batch_update, {'requests': [
+                header_format_request(
+                    existing[worksheet_name], len(df.columns))
+                for worksheet_name, df in pending
+            ]})
+
+            for worksheet_name, df in pending:
+                print(
+                    f"✅ Dados enviados para aba '{worksheet_name}' ({len(df)} linhas)")
+            return True
+
+        except Exception as e:
+            print(f"⚠️ Envio em lote falhou, enviando aba por aba: {e}")
+            return False
+
     def create_summary_sheets(self, df):
         """Cria planilhas de resumo a partir do DataFrame"""
 
@@ -203,17 +341,19 @@ class GoogleSheetsSync:
 
         print("📊 Criando planilhas de resumo...")
 
+        # Abas montadas primeiro e enviadas juntas no final: (nome, DataFrame)
+        pending = []
+
+        # Subconjunto de despesas filtrado uma vez e usado pelos resumos abaixo
+        despesas_df = df[df['Tipo'] == 'Despesa']
+
         # 1. Resumo Mensal
         try:
-            monthly_summary = df.groupby(['Mes_Str', 'Tipo']).agg({
-                'Valor_Absoluto': 'sum'
-            }).reset_index()
-
-            monthly_pivot = monthly_summary.pivot(
-                index='Mes_Str',
-                columns='Tipo',
-                values='Valor_Absoluto'
-            ).fillna(0)
+            # Mês x Tipo direto na tabela cruzada (sem groupby + reset_index + pivot)
+            monthly_pivot = pd.crosstab(
+                df['Mes_Str'], df['Tipo'], df['Valor_Absoluto'], aggfunc='sum').fillna(0)
+            # 'Tipo' pode ser categórico (dados vindos do dashboard)
+            monthly_pivot.columns = monthly_pivot.columns.astype(str)
 
             monthly_pivot['Saldo'] = monthly_pivot.get(
                 'Receita', 0) - monthly_pivot.get('Despesa', 0)
@@ -221,22 +361,27 @@ class GoogleSheetsSync:
                 monthly_pivot['Saldo'] / monthly_pivot.get('Receita', 1) * 100).round(2)
 
             monthly_pivot_reset = monthly_pivot.reset_index()
-            self.upload_dataframe(monthly_pivot_reset, "📅 Resumo_Mensal")
+            pending.append(("📅 Resumo_Mensal", monthly_pivot_reset))
 
         except Exception as e:
             print(f"❌ Erro no resumo mensal: {e}")
 
         # 2. Resumo por Categoria
         try:
-            category_summary = df[df['Tipo'] == 'Despesa'].groupby('Categoria').agg({
-                'Valor_Absoluto': ['sum', 'count', 'mean']
-            }).round(2)
-
-            category_summary.columns = ['Total', 'Quantidade', 'Media']
+            category_groups = despesas_df.groupby(
+                'Categoria', observed=True)['Valor_Absoluto']
+            # Média derivada de soma/contagem, sem uma terceira agregação
+            category_summary = pd.DataFrame({
+                'Total': category_groups.sum(),
+                'Quantidade': category_groups.count()
+            })
+            category_summary['Media'] = (
+                category_summary['Total'] / category_summary['Quantidade']).round(2)
+            category_summary['Total'] = category_summary['Total'].round(2)
             category_summary = category_summary.sort_values(
                 'Total', ascending=False).reset_index()
 
-            self.upload_dataframe(category_summary, "🏷️ Resumo_Categorias")
+            pending.append(("🏷️ Resumo_Categorias", category_summary))
 
         except Exception as e:
             print(f"❌ Erro no resumo por categoria: {e}")
@@ -244,32 +389,27 @@ class GoogleSheetsSync:
         # 3. Custos Fixos vs Variáveis (se disponível)
         if 'Custo_Tipo' in df.columns:
             try:
-                fixed_var_summary = df[df['Tipo'] == 'Despesa'].groupby(['Mes_Str', 'Custo_Tipo']).agg({
-                    'Valor_Absoluto': 'sum'
-                }).reset_index()
+                fixed_var_pivot = pd.crosstab(
+                    despesas_df['Mes_Str'], despesas_df['Custo_Tipo'],
+                    despesas_df['Valor_Absoluto'], aggfunc='sum').fillna(0)
+                fixed_var_pivot.columns = fixed_var_pivot.columns.astype(str)
+                fixed_var_pivot = fixed_var_pivot.reset_index()
 
-                fixed_var_pivot = fixed_var_summary.pivot(
-                    index='Mes_Str',
-                    columns='Custo_Tipo',
-                    values='Valor_Absoluto'
-                ).fillna(0).reset_index()
-
-                self.upload_dataframe(
-                    fixed_var_pivot, "💡 Custos_Fixos_vs_Variaveis")
+                pending.append(
+                    ("💡 Custos_Fixos_vs_Variaveis", fixed_var_pivot))
 
             except Exception as e:
                 print(f"❌ Erro no resumo fixos vs variáveis: {e}")
 
         # 4. Top Gastos
         try:
-            top_expenses = df[df['Tipo'] == 'Despesa'].nlargest(
-                50, 'Valor_Absoluto')
-            top_expenses_clean = top_expenses[[
-                'Data', 'Descrição', 'Categoria', 'Valor_Absoluto']].copy()
-            top_expenses_clean['Data'] = top_expenses_clean['Data'].dt.strftime(
-                '%d/%m/%Y')
+            top_expenses = despesas_df.nlargest(
+                50, 'Valor_Absoluto')[['Data', 'Descrição', 'Categoria', 'Valor_Absoluto']]
+            # assign devolve um novo frame: dispensa o .copy() da fatia
+            top_expenses_clean = top_expenses.assign(
+                Data=top_expenses['Data'].dt.strftime('%d/%m/%Y'))
 
-            self.upload_dataframe(top_expenses_clean, "🔝 Top_50_Gastos")
+            pending.append(("🔝 Top_50_Gastos", top_expenses_clean))
 
         except Exception as e:
             print(f"❌ Erro no top gastos: {e}")
@@ -277,7 +417,7 @@ class GoogleSheetsSync:
         # 5. Estabelecimentos (se for dados Nubank)
         if 'Descrição' in df.columns:
             try:
-                establishment_analysis = df.groupby('Descrição').agg({
+                establishment_analysis = df.groupby('Descrição', observed=True).agg({
                     'Valor_Absoluto': ['sum', 'mean', 'count'],
                     'Data': ['min', 'max']
                 }).round(2)
@@ -293,39 +433,81 @@ class GoogleSheetsSync:
                 establishment_analysis['Ultima_Compra'] = pd.to_datetime(
                     establishment_analysis['Ultima_Compra']).dt.strftime('%d/%m/%Y')
 
-                self.upload_dataframe(
-                    establishment_analysis.head(100), "🏪 Estabelecimentos")
+                pending.append(
+                    ("🏪 Estabelecimentos", establishment_analysis.head(100)))
 
             except Exception as e:
                 print(f"❌ Erro na análise de estabelecimentos: {e}")
 
+        # Enviar todas as abas de resumo de uma vez
+        if pending and not self.upload_dataframes_batch(pending):
+            for worksheet_name, summary_df in pending:
+                self.upload_dataframe(summary_df, worksheet_name)
+
         return True
 
 
+def detect_csv_encoding(file, sample_size=65536):
+    """Detecta o encoding a partir de uma amostra do início do arquivo"""
+    with open(file, 'rb') as f:
+        head = f.read(sample_size)
+
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    try:
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # Caractere multibyte cortado no fim da amostra ainda é UTF-8
+        return 'utf-8' if e.start >= len(head) - 3 else 'latin-1'
+
+
+def read_csv_with_fallback(file):
+    """Lê um CSV com o encoding detectado; retorna (DataFrame ou None, mensagem de erro)"""
+    try:
+        encoding = detect_csv_encoding(file)
+
+        # Parser multithread do pyarrow primeiro; engine C se ele recusar o arquivo
+        if PYARROW_AVAILABLE:
+            try:
+                return pd.read_csv(file, engine='pyarrow', encoding=encoding), None
+            except Exception:
+                pass
+
+        try:
+            return pd.read_csv(file, encoding=encoding), None
+        except UnicodeDecodeError:
+            # Byte inválido depois da amostra: latin-1 decodifica qualquer byte
+            return pd.read_csv(file, encoding='latin-1'), None
+    except Exception as e:
+        return None, str(e)
+
+
 def load_financial_data():
     """Carrega dados financeiros dos CSVs"""
     print("📁 Procurando arquivos CSV...")
 
     # Padrões de busca priorizando Nubank
-    csv_patterns = [
-        "Nubank_*.csv",  # Prioritário
-        "*.csv",
-        "data/*.csv",
-        "data/raw/*.csv",
-        "extratos/*.csv"
-    ]
-
     all_files = []
     nubank_files = []
 
-    for pattern in csv_patterns:
-        files = glob.glob(pattern)
-        all_files.extend(files)
-        if "Nubank_" in pattern:
-            nubank_files.extend(files)
-
-    # Remover duplicatas
-    all_files = list(dict.fromkeys(all_files))
+    # Uma listagem por pasta (scandir) em vez de um glob por padrão
+    for directory in CSV_SEARCH_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.name.endswith('.csv') and not entry.name.startswith('.')
+                           and entry.is_file())
+        for name in names:
+            all_files.append(name if directory ==
+                             '.' else os.path.join(directory, name))
+            # Nubank_*.csv da pasta atual são prioritários
+            if directory == '.' and name.startswith('Nubank_'):
+                nubank_files.append(name)
+
+    # Nubank primeiro, sem duplicatas
+    all_files = list(dict.fromkeys(nubank_files + all_files))
 
     if not all_files:
         print("❌ Nenhum arquivo CSV encontrado!")
@@ -343,30 +525,23 @@ def load_financial_data():
     if is_nubank_data:
         print(f"💳 {len(nubank_files)} arquivo(s) Nubank detectado(s)")
 
-    # Carregar e combinar CSVs
+    # Carregar e combinar CSVs (leituras independentes em paralelo, resultados na ordem original)
     dfs = []
-    for file in files_to_process:
-        try:
-            # Tentar diferentes encodings
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            df = None
-
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(file, encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if df is not None:
-                df['arquivo_origem'] = os.path.basename(file)
-                dfs.append(df)
-                print(f"  ✅ {os.path.basename(file)}")
-            else:
-                print(f"  ❌ {os.path.basename(file)} - erro de encoding")
-
-        except Exception as e:
-            print(f"  ❌ {os.path.basename(file)}: {str(e)}")
+    with ThreadPoolExecutor(max_workers=min(CSV_READ_WORKERS, len(files_to_process))) as executor:
+        results = list(executor.map(read_csv_with_fallback, files_to_process))
+
+    # Mesmo dtype categórico em todos os arquivos: o concat mantém os códigos em vez de strings repetidas
+    source_dtype = pd.CategoricalDtype(
+        list(dict.fromkeys(os.path.basename(file) for file in files_to_process)))
+
+    for file, (df, error) in zip(files_to_process, results):
+        if df is not None:
+            df['arquivo_origem'] = pd.Series(
+                os.path.basename(file), index=df.index, dtype=source_dtype)
+            dfs.append(df)
+            print(f"  ✅ {os.path.basename(file)}")
+        else:
+            print(f"  ❌ {os.path.basename(file)}: {error}")
 
     if not dfs:
         return pd.DataFrame()
@@ -390,8 +565,8 @@ def load_financial_data():
             combined_df['amount'], errors='coerce')
 
         # No Nubank: negativos = despesas, positivos = receitas/estornos
-        combined_df['Tipo'] = combined_df['Valor'].apply(
-            lambda x: 'Receita' if x > 0 else 'Despesa')
+        combined_df['Tipo'] = np.where(
+            combined_df['Valor'].to_numpy() > 0, 'Receita', 'Despesa')
 
         print("💳 Formato Nubank processado")
     else:
@@ -400,8 +575,8 @@ def load_financial_data():
             combined_df['Data'], errors='coerce')
         combined_df['Valor'] = pd.to_numeric(
             combined_df['Valor'], errors='coerce')
-        combined_df['Tipo'] = combined_df['Valor'].apply(
-            lambda x: 'Receita' if x > 0 else 'Despesa')
+        combined_df['Tipo'] = np.where(
+            combined_df['Valor'].to_numpy() > 0, 'Receita', 'Despesa')
 
         print("🏦 Formato bancário tradicional processado")
 
@@ -425,6 +600,11 @@ def load_financial_data():
     else:
         combined_df['Categoria'] = combined_df['Categoria'].fillna('Outros')
 
+    # Texto em Arrow: str.contains e groupby usam os kernels do pyarrow, com bem menos memória
+    if PYARROW_AVAILABLE:
+        combined_df[['Descrição', 'Categoria']] = combined_df[[
+            'Descrição', 'Categoria']].astype('string[pyarrow]')
+
     # Identificar custos fixos (básico)
     combined_df['Custo_Tipo'] = 'Variável'
 
@@ -435,14 +615,16 @@ def load_financial_data():
     ]
 
     if 'Descrição' in combined_df.columns:
-        for pattern in fixed_patterns:
-            mask = combined_df['Descrição'].str.contains(
-                pattern, case=False, na=False)
-            combined_df.loc[mask, 'Custo_Tipo'] = 'Fixo'
+        # Uma única alternação regex: uma passada sobre a coluna para todos os padrões
+        mask = combined_df['Descrição'].str.contains(
+            '|'.join(re.escape(pattern) for pattern in fixed_patterns), case=False, na=False)
+        combined_df.loc[mask, 'Custo_Tipo'] = 'Fixo'
 
     # Remover duplicatas
     if 'ID' in combined_df.columns:
-        combined_df = combined_df.drop_duplicates(subset=['ID'], keep='first')
+        # Códigos inteiros do factorize: a detecção de repetidos não re-hasheia as strings
+        id_codes, _ = pd.factorize(combined_df['ID'].to_numpy())
+        combined_df = combined_df[~pd.Index(id_codes).duplicated(keep='first')]
 
     print(f"✅ {len(combined_df)} transações processadas")
     print(
@@ -8,10 +8,33 @@ Execute: python system_checker.py
 import os
 import sys
 import pandas as pd
-import glob
 from datetime import datetime
 from pathlib import Path
 import json
+import importlib.util
+
+# Só verifica se o pyarrow está instalado, sem carregá-lo
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Pastas onde os extratos CSV são procurados
+CSV_SEARCH_FOLDERS = ['.', 'data/raw', 'extratos']
+
+def find_csv_files(folders=CSV_SEARCH_FOLDERS):
+    """Lista os CSVs das pastas com os.scandir (uma listagem por pasta, tipo vindo do próprio diretório)"""
+    csv_files = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        with os.scandir(folder) as entries:
+            csv_files.extend(
+                os.path.normpath(entry.path) for entry in entries
+                if entry.name.endswith('.csv') and entry.is_file(follow_symlinks=False)
+            )
+    return csv_files
+
+def find_nubank_files():
+    """Extratos Nubank_*.csv da pasta atual"""
+    return [file for file in find_csv_files(['.']) if file.startswith('Nubank_')]
 
 class SystemChecker:
     """Verificador completo do sistema Dashboard Financeiro"""
@@ -82,23 +105,29 @@ class SystemChecker:
             'folders_missing': []
         }
         
+        # Todos os caminhos verificados de uma vez (um stat por caminho)
+        existing = {
+            path: os.path.exists(path)
+            for path in required_structure['files'] + required_structure['src_modules'] + required_structure['folders']
+        }
+        
         # Verificar arquivos principais
         for file in required_structure['files']:
-            if os.path.exists(file):
+            if existing[file]:
                 structure_report['files_found'] += 1
             else:
                 structure_report['files_missing'].append(file)
         
         # Verificar módulos src/
         for module in required_structure['src_modules']:
-            if os.path.exists(module):
+            if existing[module]:
                 structure_report['modules_found'] += 1
             else:
                 structure_report['modules_missing'].append(module)
         
         # Verificar pastas
         for folder in required_structure['folders']:
-            if os.path.exists(folder):
+            if existing[folder]:
                 structure_report['folders_found'] += 1
             else:
                 structure_report['folders_missing'].append(folder)
@@ -171,13 +200,6 @@ class SystemChecker:
         """Verifica arquivos de dados"""
         print("📊 Verificando arquivos de dados...")
         
-        # Procurar CSVs
-        csv_patterns = [
-            "Nubank_*.csv",
-            "*.csv",
-            "data/raw/*.csv",
-            "extratos/*.csv"
-        ]
         
         data_report = {
             'nubank_files': [],
@@ -186,13 +208,8 @@ class SystemChecker:
             'sample_analysis': {}
         }
         
-        all_csvs = []
-        for pattern in csv_patterns:
-            files = glob.glob(pattern)
-            all_csvs.extend(files)
-        
-        # Remover duplicatas
-        all_csvs = list(set(all_csvs))
+        # Procurar CSVs (uma listagem por pasta, sem duplicatas)
+        all_csvs = find_csv_files()
         data_report['total_files'] = len(all_csvs)
         
         # Separar arquivos Nubank
@@ -206,13 +223,25 @@ class SystemChecker:
         if all_csvs:
             try:
                 sample_file = all_csvs[0]
-                df = pd.read_csv(sample_file)
+                # Só o cabeçalho primeiro; depois apenas as colunas usadas na análise
+                columns = list(pd.read_csv(sample_file, nrows=0).columns)
+                is_nubank_format = all(col in columns for col in ['date', 'title', 'amount'])
+                usecols = ['date', 'amount'] if is_nubank_format else columns[:1]
+                df = None
+                if PYARROW_AVAILABLE:
+                    # Parser multithread do pyarrow; engine C se ele recusar o arquivo
+                    try:
+                        df = pd.read_csv(sample_file, usecols=usecols, engine='pyarrow')
+                    except Exception:
+                        df = None
+                if df is None:
+                    df = pd.read_csv(sample_file, usecols=usecols)
                 
                 data_report['sample_analysis'] = {
                     'file': os.path.basename(sample_file),
                     'rows': len(df),
-                    'columns': list(df.columns),
-                    'is_nubank_format': all(col in df.columns for col in ['date', 'title', 'amount'])
+                    'columns': columns,
+                    'is_nubank_format': is_nubank_format
                 }
                 
                 # Análise adicional se for Nubank
@@ -318,7 +347,7 @@ class SystemChecker:
         
         try:
             # Teste 1: Carregar dados
-            csv_files = glob.glob("*.csv") + glob.glob("data/raw/*.csv") + glob.glob("Nubank_*.csv")
+            csv_files = find_csv_files(['.', 'data/raw'])
             if csv_files:
                 test_file = csv_files[0]
                 df = pd.read_csv(test_file)
@@ -381,7 +410,7 @@ class SystemChecker:
         """Análise detalhada dos dados Nubank"""
         print("💳 Analisando dados Nubank em detalhes...")
         
-        nubank_files = glob.glob("Nubank_*.csv")
+        nubank_files = find_nubank_files()
         
         if not nubank_files:
             self.log_test('nubank_analysis', 'WARNING', "Nenhum arquivo Nubank encontrado")
@@ -701,7 +730,7 @@ def quick_check():
         issues.append("pasta src/ faltando")
     
     # Dados
-    csv_files = glob.glob("*.csv") + glob.glob("Nubank_*.csv") + glob.glob("data/raw/*.csv")
+    csv_files = find_csv_files(['.', 'data/raw'])
     if not csv_files:
         issues.append("nenhum CSV encontrado")
     
@@ -724,7 +753,7 @@ def check_nubank_files_only():
     """Verifica apenas arquivos Nubank"""
     print("💳 VERIFICAÇÃO ESPECÍFICA - ARQUIVOS NUBANK")
     
-    nubank_files = glob.glob("Nubank_*.csv")
+    nubank_files = find_nubank_files()
     
     if not nubank_files:
         print("❌ Nenhum arquivo Nubank_*.csv encontrado")